@@ -1,15 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import numpy as np
 import os
 import sys
 import logging
+import threading
 from datetime import datetime
 
 # Add models directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
 
-from models.random_forest import DiabetesPredictor
+from models.random_forest import RandomForestClassifier
+from validation import FEATURE_FIELDS, validate_records
+from prediction_cache import PredictionCache
+from micro_batcher import MicroBatcher
+from model_watcher import ModelManager
+from model_registry import ModelRegistry, UnknownModelError
+from metrics import Counter, Gauge, Histogram, Registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,24 +28,198 @@ CORS(app)
 # Global model instance
 model = None
 
+# Model artifacts in order of preference: the memory-mapped compact format
+# (see convert_model.py) shares one copy between worker processes
+MODEL_PATHS = ['diabetes_model.rfm', 'diabetes_model.joblib']
+
+# Largest number of records accepted by /predict/batch in one request
+MAX_BATCH_SIZE = 10000
+
+# Cache of /predict results keyed on the validated feature vector; cleared on model load
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get('PREDICTION_CACHE_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+)
+
+# Prometheus metrics served on /metrics
+metrics_registry = Registry()
+STAGE_LATENCY = metrics_registry.register(Histogram(
+    'ml_stage_latency_seconds', 'Time spent in each prediction stage', ['endpoint', 'stage']
+))
+REQUESTS = metrics_registry.register(Counter(
+    'ml_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'status']
+))
+REQUEST_ERRORS = metrics_registry.register(Counter(
+    'ml_request_errors_total', 'HTTP requests that returned an error status', ['endpoint', 'status']
+))
+FOREST_CALLS = metrics_registry.register(Counter(
+    'ml_forest_inference_calls_total', 'Forest inference calls'
+))
+FOREST_SAMPLES = metrics_registry.register(Counter(
+    'ml_forest_samples_total', 'Samples scored by the forest'
+))
+FOREST_NODES_VISITED = metrics_registry.register(Counter(
+    'ml_forest_nodes_visited_total', 'Tree nodes visited during forest traversal'
+))
+FOREST_INFERENCE = metrics_registry.register(Histogram(
+    'ml_forest_inference_seconds', 'Forest traversal and voting time per inference call'
+))
+
+def record_forest_stats(stats):
+    FOREST_CALLS.inc()
+    FOREST_SAMPLES.inc(stats['samples'])
+    FOREST_NODES_VISITED.inc(stats['nodes_visited'])
+    FOREST_INFERENCE.observe(stats['seconds'])
+
+RandomForestClassifier.add_inference_hook(record_forest_stats)
+
+# Serializes swaps so the model and the cache generation always change together
+model_swap_lock = threading.Lock()
+
+def swap_model(predictor):
+    """Atomically replace the served model; requests already holding the old one finish on it"""
+    global model
+    with model_swap_lock:
+        # Model first, then the generation bump: a request that reads the
+        # generation before selecting its model can then never store an old
+        # model's result under the new generation
+        model = predictor
+        prediction_cache.clear()
+
+# Loads the model in the background and hot-swaps it whenever a new artifact is deployed
+model_manager = ModelManager(
+    MODEL_PATHS, swap_model, poll_interval=float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+)
+
 def load_model():
     """Load the trained diabetes model"""
-    global model
-    
-    model_path = 'diabetes_model.joblib'
-    
-    if os.path.exists(model_path):
-        try:
-            model = DiabetesPredictor.load_model(model_path)
-            logger.info(f"Model loaded successfully from {model_path}")
-            return True
-        except Exception as e:
-            logger.error(f"Error loading model: {e}")
-            return False
-    else:
-        logger.warning(f"Model file not found: {model_path}")
-        logger.info("Please train the model first by running: python train_model.py")
+    return model_manager.load()
+
+# Named model versions (e.g. cohort-specific models) served side by side with
+# the default model via ?model=<name>&version=<version>; loaded on first use and
+# evicted least-recently-used first once MODEL_MEMORY_BUDGET_MB is exceeded
+model_registry = ModelRegistry(
+    os.environ.get('MODEL_REGISTRY_DIR', 'model_store'),
+    memory_budget_bytes=int(float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 512)) * 1024 * 1024)
+)
+
+def select_model(args):
+    """Return (predictor, name, version) for ?model=...&version=..., or the
+    default hot-swapped model with name and version None"""
+    name = args.get('model')
+    if not name:
+        if args.get('version'):
+            raise ValueError("version requires a model name")
+        return model, None, None
+    predictor, version = model_registry.get(name, args.get('version') or None)
+    return predictor, name, version
+
+def predict_rows(X, predictor, endpoint='/predict', early_exit=None, contributions=False):
+    """Score validated feature rows with one forest call; returns one response body per row"""
+    with STAGE_LATENCY.time(endpoint=endpoint, stage='inference'):
+        if early_exit is None:
+            output = predictor.predict_all(X, contributions=contributions)
+        else:
+            output = predictor.predict_early_exit(X, **early_exit)
+    with STAGE_LATENCY.time(endpoint=endpoint, stage='risk_factors'):
+        risk_factors = predictor.get_risk_factors_batch(X)
+    trees_used = output.get('trees_used')
+    results = [
+        format_prediction(
+            output['labels'][row], output['probabilities'][row], risk_factors[row],
+            None if trees_used is None else int(trees_used[row])
+        )
+        for row in range(len(X))
+    ]
+    if contributions:
+        # Contributions to the diabetic probability, keyed by request field name
+        for result, row_contributions in zip(results, output['contributions'][:, :, 1].tolist()):
+            result['base_probability'] = float(output['bias'][1])
+            result['feature_contributions'] = dict(zip(FEATURE_FIELDS, row_contributions))
+    return results
+
+def parse_contributions(args, early_exit):
+    """?contributions=true adds per-feature contributions (computed in the
+    same forest traversal) to every prediction"""
+    if args.get('contributions', '').lower() not in ('1', 'true', 'yes'):
         return False
+    if early_exit is not None:
+        raise ValueError("contributions cannot be combined with early_exit")
+    return True
+
+def parse_early_exit(args):
+    """Read the early-exit voting options from the query string.
+
+    ?early_exit=true stops evaluating trees once the label is settled;
+    tolerance=<max probability error> (and optionally confidence, default
+    0.95) instead stops once the probability is that accurate.
+    Returns None when early exit is not requested.
+    """
+    enabled = args.get('early_exit', '').lower() in ('1', 'true', 'yes')
+    if not enabled and 'tolerance' not in args:
+        return None
+    options = {'tolerance': None, 'confidence': 0.95}
+    if 'tolerance' in args:
+        options['tolerance'] = float(args['tolerance'])
+        if not 0 < options['tolerance'] <= 1:
+            raise ValueError("tolerance must be between 0 and 1")
+    if 'confidence' in args:
+        options['confidence'] = float(args['confidence'])
+        if not 0 < options['confidence'] < 1:
+            raise ValueError("confidence must be between 0 and 1")
+    return options
+
+def model_unavailable():
+    if model_manager.loading:
+        return jsonify({'error': 'Model is loading. Please retry shortly.'}), 503, {'Retry-After': '1'}
+    return jsonify({
+        'error': 'Model not loaded. Please train the model first.'
+    }), 500
+
+# Micro-batching serving mode: concurrent /predict rows are grouped into one
+# forest call of up to MICRO_BATCH_MAX_SIZE rows, waiting at most MICRO_BATCH_WAIT_MS
+micro_batcher = None
+if os.environ.get('MICRO_BATCHING', '').lower() in ('1', 'true', 'yes'):
+    micro_batcher = MicroBatcher(
+        predict_rows,
+        max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64)),
+        max_wait_ms=float(os.environ.get('MICRO_BATCH_WAIT_MS', 2))
+    )
+
+def model_info():
+    active = model_manager.status()['active']
+    return [({'version': active['version']}, 1)] if active else []
+
+metrics_registry.register(Gauge('ml_model_info', 'Model version currently served', model_info))
+
+def registry_resident_bytes():
+    return [({}, model_registry.resident_bytes)]
+
+metrics_registry.register(Gauge(
+    'ml_model_registry_resident_bytes', 'Bytes held by models loaded in the model registry',
+    registry_resident_bytes
+))
+
+def nodes_per_sample():
+    samples = FOREST_SAMPLES.get()
+    return [({}, FOREST_NODES_VISITED.get() / samples if samples else 0)]
+
+metrics_registry.register(Gauge(
+    'ml_forest_nodes_visited_per_sample', 'Average tree nodes visited per scored sample', nodes_per_sample
+))
+
+@app.after_request
+def count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 400:
+        REQUEST_ERRORS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -46,96 +227,163 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'model_loaded': model is not None,
+        'model': model_manager.status(),
         'timestamp': datetime.now().isoformat(),
-        'model_type': 'CustomRandomForestClassifier'
+        'model_type': 'CustomRandomForestClassifier',
+        'model_registry': model_registry.status(),
+        'prediction_cache': prediction_cache.stats(),
+        'micro_batching': micro_batcher.stats() if micro_batcher else None
     })
 
+def format_prediction(prediction, probabilities, risk_factors, trees_used=None):
+    """Build the response body for one predicted record"""
+    result = {
+        'prediction': bool(prediction),
+        'confidence': float(probabilities[1] if prediction else probabilities[0]),
+        'probability': float(probabilities[1]),
+        'probability_diabetic': float(probabilities[1]),
+        'probability_non_diabetic': float(probabilities[0]),
+        'risk_factors': risk_factors,
+        'model_version': '1.0',
+        'model_type': 'CustomRandomForestClassifier'
+    }
+    if trees_used is not None:
+        result['trees_used'] = trees_used
+    return result
+
 @app.route('/predict', methods=['POST'])
 def predict_diabetes():
     """Diabetes prediction endpoint"""
     try:
-        if model is None:
-            return jsonify({
-                'error': 'Model not loaded. Please train the model first.'
-            }), 500
+        # Read before selecting the model so a result from a model swapped out
+        # mid-request is not cached (see swap_model)
+        cache_generation = prediction_cache.generation
+        # Hold one model reference for the whole request so a hot-swap cannot split it
+        predictor, model_name, model_version = select_model(request.args)
+        if predictor is None:
+            return model_unavailable()
         
-        data = request.get_json()
+        with STAGE_LATENCY.time(endpoint='/predict', stage='parse'):
+            data = request.get_json()
+            early_exit = parse_early_exit(request.args)
+            contributions = parse_contributions(request.args, early_exit)
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Validate required fields
-        required_fields = [
-            'pregnancies', 'glucose', 'bloodPressure', 'skinThickness',
-            'insulin', 'bmi', 'diabetesPedigree', 'age'
-        ]
+        # Validate required fields and feature ranges
+        with STAGE_LATENCY.time(endpoint='/predict', stage='validation'):
+            X, errors = validate_records([data])
+        if errors[0]:
+            return jsonify({'error': errors[0]}), 400
+
+        cache_key = X.tobytes()
+        if model_name is not None:
+            cache_key += f'{model_name}@{model_version}'.encode()
+        if early_exit is not None:
+            cache_key += repr(sorted(early_exit.items())).encode()
+        if contributions:
+            cache_key += b'contributions'
+        cached = prediction_cache.get(cache_key)
+        
+        if cached is not None:
+            result = dict(cached)
+        else:
+            # Make prediction and get risk factors, batched with concurrent requests if enabled;
+            # early-exit and contribution requests are scored on their own
+            if micro_batcher is not None and early_exit is None and not contributions:
+                result = micro_batcher.submit(X[0], predictor).result()
+            else:
+                result = predict_rows(X, predictor, early_exit=early_exit, contributions=contributions)[0]
+            prediction_cache.put(cache_key, result, cache_generation)
+            result = dict(result)
+        
+        # Prepare response
+        if model_name is not None:
+            result['model_name'], result['model_version'] = model_name, model_version
+        result['cached'] = cached is not None
+        result['timestamp'] = datetime.now().isoformat()
         
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        logger.info(f"Prediction made: {result['prediction']} (confidence: {result['confidence']:.3f})")
         
-        # Extract features
-        features = [
-            float(data['pregnancies']),
-            float(data['glucose']),
-            float(data['bloodPressure']),
-            float(data['skinThickness']),
-            float(data['insulin']),
-            float(data['bmi']),
-            float(data['diabetesPedigree']),
-            float(data['age'])
-        ]
+        with STAGE_LATENCY.time(endpoint='/predict', stage='serialization'):
+            return jsonify(result)
         
-        # Validate feature ranges
-        validations = {
-            0: (0, 20, 'pregnancies'),
-            1: (50, 400, 'glucose'),
-            2: (40, 200, 'bloodPressure'),
-            3: (0, 100, 'skinThickness'),
-            4: (0, 1000, 'insulin'),
-            5: (10, 70, 'bmi'),
-            6: (0, 3, 'diabetesPedigree'),
-            7: (18, 120, 'age')
-        }
+    except UnknownModelError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        logger.error(f"Validation error: {e}")
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_diabetes_batch():
+    """Batch diabetes prediction endpoint.
+
+    Accepts a JSON array of records (or {"records": [...]}) with the same
+    fields as /predict. Valid rows are scored in a single forest call;
+    invalid rows get an error entry at their position in the results.
+    """
+    try:
+        # Hold one model reference for the whole request so a hot-swap cannot split it
+        predictor, model_name, model_version = select_model(request.args)
+        if predictor is None:
+            return model_unavailable()
         
-        for idx, (min_val, max_val, field_name) in validations.items():
-            if not (min_val <= features[idx] <= max_val):
-                return jsonify({
-                    'error': f'{field_name} must be between {min_val} and {max_val}'
-                }), 400
+        with STAGE_LATENCY.time(endpoint='/predict/batch', stage='parse'):
+            data = request.get_json()
+            early_exit = parse_early_exit(request.args)
+            contributions = parse_contributions(request.args, early_exit)
+        records = data.get('records') if isinstance(data, dict) else data
         
-        # Make prediction
-        features_array = np.array([features])
-        prediction = model.predict(features_array)[0]
-        probabilities = model.predict_proba(features_array)[0]
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': 'Provide a non-empty array of records'}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch size must not exceed {MAX_BATCH_SIZE} records'}), 400
         
-        # Get risk factors
-        risk_factors = model.get_risk_factors(features)
+        with STAGE_LATENCY.time(endpoint='/predict/batch', stage='validation'):
+            X, errors = validate_records(records)
+        valid_rows = np.array([error is None for error in errors])
+        results = [{'index': idx, 'error': error} for idx, error in enumerate(errors)]
         
-        # Prepare response
-        result = {
-            'prediction': bool(prediction),
-            'confidence': float(probabilities[1] if prediction else probabilities[0]),
-            'probability': float(probabilities[1]),
-            'probability_diabetic': float(probabilities[1]),
-            'probability_non_diabetic': float(probabilities[0]),
-            'risk_factors': risk_factors,
-            'model_version': '1.0',
-            'model_type': 'CustomRandomForestClassifier',
-            'timestamp': datetime.now().isoformat()
-        }
+        if valid_rows.any():
+            valid_results = predict_rows(
+                X[valid_rows], predictor, endpoint='/predict/batch', early_exit=early_exit,
+                contributions=contributions
+            )
+            for result, idx in zip(valid_results, np.nonzero(valid_rows)[0]):
+                result['index'] = int(idx)
+                if model_name is not None:
+                    result['model_name'], result['model_version'] = model_name, model_version
+                results[idx] = result
         
-        logger.info(f"Prediction made: {result['prediction']} (confidence: {result['confidence']:.3f})")
+        n_valid = int(valid_rows.sum())
+        logger.info(f"Batch prediction made: {n_valid} valid, {len(records) - n_valid} invalid records")
         
-        return jsonify(result)
+        with STAGE_LATENCY.time(endpoint='/predict/batch', stage='serialization'):
+            return jsonify({
+                'results': results,
+                'count': len(records),
+                'valid': n_valid,
+                'invalid': len(records) - n_valid,
+                'timestamp': datetime.now().isoformat()
+            })
         
+    except UnknownModelError as e:
+        return jsonify({'error': e.args[0]}), 404
     except ValueError as e:
         logger.error(f"Validation error: {e}")
         return jsonify({'error': f'Invalid input: {str(e)}'}), 400
     except Exception as e:
-        logger.error(f"Prediction error: {e}")
+        logger.error(f"Batch prediction error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+# Start loading in the background so WSGI servers serve /health immediately
+if os.environ.get('MODEL_WATCH', '1').lower() not in ('0', 'false', 'no'):
+    model_manager.start()
+
 if __name__ == '__main__':
     # Load model on startup
     load_model()
@@ -0,0 +1,115 @@
+"""Benchmark the sort-based split search against the exhaustive one it replaced.
+
+Run from the ml-backend directory:
+
+    python benchmarks/bench_split_search.py --rows 1000 2000 --n-estimators 10
+
+Both finders train a forest with the same seed; the script checks that the
+resulting trees are identical and prints the training-time speedup.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ingest import FEATURE_COLUMNS, LABEL_COLUMN
+from models.random_forest import DecisionTree, RandomForestClassifier
+
+
+def exhaustive_best_split(self, rows):
+    """Original split finder: re-masks and re-scores every unique value.
+
+    It ran on a resampled copy of the data, so the node's rows are expanded
+    by their bootstrap counts first.
+    """
+    best_gain = -1
+    best_feature = None
+    best_threshold = None
+
+    expanded = np.repeat(rows, self._weight[rows].astype(int))
+    X, y = self._X[expanded], self._y[expanded]
+
+    n_features = X.shape[1]
+    feature_indices = self._candidate_features(n_features)
+
+    for feature_idx in feature_indices:
+        X_column = X[:, feature_idx]
+        thresholds = np.unique(X_column)
+
+        for threshold in thresholds:
+            left_mask = X_column <= threshold
+            right_mask = ~left_mask
+
+            if np.sum(left_mask) == 0 or np.sum(right_mask) == 0:
+                continue
+
+            parent_gini = self._gini_impurity(y)
+            n = len(y)
+            n_left, n_right = np.sum(left_mask), np.sum(right_mask)
+
+            left_gini = self._gini_impurity(y[left_mask])
+            right_gini = self._gini_impurity(y[right_mask])
+
+            child_gini = (n_left / n) * left_gini + (n_right / n) * right_gini
+            gain = parent_gini - child_gini
+
+            if gain > best_gain:
+                best_gain = gain
+                best_feature = feature_idx
+                best_threshold = threshold
+
+    return best_feature, best_threshold, best_gain
+
+
+def load_data(csv_path):
+    df = pd.read_csv(csv_path)
+    df = df.apply(pd.to_numeric, errors='coerce').dropna()
+    X = df[FEATURE_COLUMNS].values.astype(float)
+    y = df[LABEL_COLUMN].values.astype(int)
+    return X, y
+
+
+def time_fit(X, y, n_estimators, max_depth, split_finder):
+    original = DecisionTree._best_split
+    DecisionTree._best_split = split_finder
+    try:
+        forest = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42)
+        start = time.perf_counter()
+        forest.fit(X, y)
+        return forest, time.perf_counter() - start
+    finally:
+        DecisionTree._best_split = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(__file__), '..', 'diabetes.csv'))
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 1000, 2000])
+    parser.add_argument('--n-estimators', type=int, default=5)
+    parser.add_argument('--max-depth', type=int, default=15)
+    args = parser.parse_args()
+
+    X, y = load_data(args.data)
+    sort_based = DecisionTree._best_split
+
+    print(f"{'rows':>8} {'exhaustive (s)':>15} {'sort-based (s)':>15} {'speedup':>8} {'identical':>10}")
+    for n_rows in args.rows:
+        X_sub, y_sub = X[:n_rows], y[:n_rows]
+        old_forest, old_time = time_fit(X_sub, y_sub, args.n_estimators, args.max_depth, exhaustive_best_split)
+        new_forest, new_time = time_fit(X_sub, y_sub, args.n_estimators, args.max_depth, sort_based)
+        identical = all(
+            np.array_equal(old_tree.feature, new_tree.feature)
+            and np.array_equal(old_tree.threshold, new_tree.threshold, equal_nan=True)
+            and np.array_equal(old_tree.value, new_tree.value)
+            for old_tree, new_tree in zip(old_forest.trees, new_forest.trees)
+        )
+        print(f"{len(X_sub):>8} {old_time:>15.3f} {new_time:>15.3f} {old_time / new_time:>7.1f}x {str(identical):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""Load test the /predict endpoint under different serving configurations.
+
+Run from the ml-backend directory:
+
+    python benchmarks/load_test.py --configs flask gunicorn --concurrency 1 4 16 --duration 10
+    python benchmarks/load_test.py --configs flask --rates 50 100 200 --slo-ms 50
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 8
+
+For every configuration the service is started on a free local port. The
+harness waits until /health reports a loaded model, replays /predict
+payloads at each load level, then stops the service. Payloads are rows of
+diabetes.csv that pass the API's range checks, sent with the camelCase
+field names the Node route forwards. The prediction cache is disabled so
+every request reaches the forest.
+
+--concurrency runs a closed loop: N clients each send their next request
+as soon as the last one returns. --rates runs an open loop: requests are
+sent at Poisson arrival times regardless of how fast the service answers,
+and latency is measured from the scheduled send time, so queueing is
+counted instead of hidden. The report gives throughput, latency
+percentiles and the error rate per level and, with --slo-ms, the highest
+level whose p99 stays within the SLO.
+
+The client runs in this process; on small machines it competes with the
+service for CPU, so compare configurations rather than absolute numbers.
+"""
+import argparse
+import http.client
+import importlib.util
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ingest import load_dataset
+from validation import FEATURE_FIELDS, MAX_VALUES, MIN_VALUES
+
+ML_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HOST = '127.0.0.1'
+
+# Fields the Node route validates as integers
+INTEGER_FIELDS = {'pregnancies', 'age'}
+
+# Serving configurations: command run from ml-backend ({port}, {workers} and
+# {threads} are filled in), extra environment and the module they need
+CONFIGS = {
+    'flask': {
+        'command': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--host', HOST, '--port', '{port}'],
+        'env': {},
+        'requires': 'flask'
+    },
+    'flask-microbatch': {
+        'command': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--host', HOST, '--port', '{port}'],
+        'env': {'MICRO_BATCHING': '1'},
+        'requires': 'flask'
+    },
+    'gunicorn': {
+        'command': [
+            sys.executable, '-m', 'gunicorn', '--workers', '{workers}', '--threads', '{threads}',
+            '--bind', HOST + ':{port}', 'app:app'
+        ],
+        'env': {},
+        'requires': 'gunicorn'
+    }
+}
+
+
+def sample_payloads(csv_path, n_payloads, seed):
+    """JSON request bodies built from valid diabetes.csv rows, in random order"""
+    X, _ = load_dataset(csv_path)
+    X = X[((X >= MIN_VALUES) & (X <= MAX_VALUES)).all(axis=1)]
+    rows = X[np.random.default_rng(seed).choice(len(X), min(n_payloads, len(X)), replace=False)]
+    return [
+        json.dumps({
+            field: int(value) if field in INTEGER_FIELDS else float(value)
+            for field, value in zip(FEATURE_FIELDS, row)
+        }).encode()
+        for row in rows
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"service exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=1)
+            conn.request('GET', '/health')
+            health = json.loads(conn.getresponse().read())
+            conn.close()
+            if health.get('model_loaded'):
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"service not ready after {timeout:.0f} s")
+
+
+class Service:
+    """Runs one serving configuration as a subprocess for the duration of a with block"""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.config = CONFIGS[name]
+        self.args = args
+        self.port = free_port()
+        self.process = None
+        self.log = None
+
+    def __enter__(self):
+        if importlib.util.find_spec(self.config['requires']) is None:
+            raise RuntimeError(f"{self.config['requires']} is not installed (pip install {self.config['requires']})")
+        command = [
+            part.format(port=self.port, workers=self.args.workers, threads=self.args.threads)
+            for part in self.config['command']
+        ]
+        env = dict(os.environ, PREDICTION_CACHE_SIZE='0', **self.config['env'])
+        self.log = tempfile.NamedTemporaryFile('w+', prefix=f'load_test_{self.name}_', suffix='.log', delete=False)
+        self.process = subprocess.Popen(command, cwd=ML_BACKEND, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        try:
+            wait_until_ready(self.port, self.process, self.args.startup_timeout)
+        except RuntimeError:
+            self.__exit__(None, None, None)
+            raise
+        return f'http://{HOST}:{self.port}'
+
+    def __exit__(self, *exc):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+        if self.process.returncode in (0, -15):
+            os.unlink(self.log.name)
+        else:
+            print(f"    service exited with status {self.process.returncode}; log: {self.log.name}")
+
+
+class Client:
+    """Sends /predict requests over one keep-alive connection per thread"""
+
+    def __init__(self, url, payloads, timeout):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.payloads = payloads
+        self.timeout = timeout
+        self._local = threading.local()
+        self._counter = itertools.count()
+        # (scheduled start, latency seconds, ok) per request
+        self.samples = []
+
+    def _connection(self):
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._local.conn
+
+    def send(self, scheduled=None):
+        """POST one payload; latency is measured from scheduled (default: now)"""
+        payload = self.payloads[next(self._counter) % len(self.payloads)]
+        start = time.perf_counter() if scheduled is None else scheduled
+        try:
+            conn = self._connection()
+            conn.request('POST', '/predict', payload, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            self._local.conn.close()
+            self._local.conn = None
+            ok = False
+        self.samples.append((start, time.perf_counter() - start, ok))
+
+
+def run_closed_loop(client, concurrency, duration, warmup):
+    start = time.perf_counter()
+    deadline = start + warmup + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            client.send()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return start + warmup
+
+
+def run_open_loop(client, rate, duration, warmup, max_connections, seed):
+    n_requests = int(rate * (warmup + duration))
+    arrivals = np.cumsum(np.random.default_rng(seed).exponential(1 / rate, n_requests))
+    with ThreadPoolExecutor(max_connections) as pool:
+        start = time.perf_counter()
+        for offset in arrivals:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Requests waiting for a free connection keep their scheduled start
+            pool.submit(client.send, start + offset)
+    return start + warmup
+
+
+def summarize(samples, measured_from, duration):
+    measured = [(latency, ok) for start, latency, ok in samples if start >= measured_from]
+    if not measured:
+        return {'requests': 0}
+    latencies = np.array([latency for latency, _ in measured]) * 1000
+    ok = np.array([ok for _, ok in measured])
+    return {
+        'requests': len(measured),
+        'throughput_rps': float(ok.sum() / duration),
+        'error_rate': float(1 - ok.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'p999_ms': float(np.percentile(latencies, 99.9)),
+        'max_ms': float(latencies.max())
+    }
+
+
+def run_levels(url, payloads, args):
+    levels = [('concurrency', level) for level in args.concurrency or []]
+    levels += [('rate', level) for level in args.rates or []]
+    results = []
+    for mode, level in levels:
+        client = Client(url, payloads, args.request_timeout)
+        if mode == 'concurrency':
+            measured_from = run_closed_loop(client, level, args.duration, args.warmup)
+        else:
+            measured_from = run_open_loop(client, level, args.duration, args.warmup, args.max_connections, args.seed)
+        stats = dict(summarize(client.samples, measured_from, args.duration), mode=mode, level=level)
+        results.append(stats)
+        if stats['requests']:
+            print(f"    {mode:<11} {level:>6} {stats['requests']:>8} {stats['throughput_rps']:>9.1f} "
+                  f"{stats['error_rate'] * 100:>6.2f}% {stats['p50_ms']:>8.2f} {stats['p90_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['p999_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+        else:
+            print(f"    {mode:<11} {level:>6} no requests completed")
+    return results
+
+
+def sustainable_level(results, slo_ms, max_error_rate=0.01):
+    """Highest load level whose p99 meets the SLO with under 1% errors"""
+    passing = [
+        result for result in results
+        if result['requests'] and result['p99_ms'] <= slo_ms and result['error_rate'] < max_error_rate
+    ]
+    return max(passing, key=lambda result: result['throughput_rps']) if passing else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /predict across serving configurations")
+    parser.add_argument('--configs', nargs='+', choices=sorted(CONFIGS), default=['flask'])
+    parser.add_argument('--url', help="Test an already running service instead of starting configurations")
+    parser.add_argument('--concurrency', type=int, nargs='+', help="Closed-loop client counts")
+    parser.add_argument('--rates', type=float, nargs='+', help="Open-loop arrival rates (requests/s)")
+    parser.add_argument('--duration', type=float, default=10, help="Measured seconds per level")
+    parser.add_argument('--warmup', type=float, default=2, help="Seconds per level excluded from the results")
+    parser.add_argument('--slo-ms', type=float, help="p99 latency target used to report the sustainable level")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument('--max-connections', type=int, default=256, help="Open-loop client connection limit")
+    parser.add_argument('--request-timeout', type=float, default=30)
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--data', default=os.path.join(ML_BACKEND, 'diabetes.csv'), help="CSV payloads are drawn from")
+    parser.add_argument('--payloads', type=int, default=2000, help="Distinct payloads to cycle through")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='load_test_results.json')
+    args = parser.parse_args()
+    if not args.concurrency and not args.rates:
+        args.concurrency = [1, 4, 16]
+
+    payloads = sample_payloads(args.data, args.payloads, args.seed)
+    print(f"{len(payloads)} payloads from {args.data}; {args.duration:.0f} s per level after {args.warmup:.0f} s warm-up")
+    header = (f"    {'mode':<11} {'level':>6} {'requests':>8} {'ok req/s':>9} {'errors':>7} "
+              f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'p99.9 ms':>8} {'max ms':>8}")
+
+    report = {}
+    targets = [('external', args.url)] if args.url else [(name, None) for name in args.configs]
+    for name, url in targets:
+        print(f"\n{name}")
+        try:
+            if url:
+                print(header)
+                report[name] = {'results': run_levels(url, payloads, args)}
+            else:
+                with Service(name, args) as service_url:
+                    print(header)
+                    report[name] = {'results': run_levels(service_url, payloads, args)}
+        except RuntimeError as e:
+            print(f"    skipped: {e}")
+            report[name] = {'error': str(e)}
+
+    if args.slo_ms is not None:
+        print(f"\nHighest load with p99 <= {args.slo_ms:g} ms and < 1% errors:")
+        for name, outcome in report.items():
+            best = sustainable_level(outcome.get('results', []), args.slo_ms)
+            outcome['sustainable'] = best
+            print(f"  {name:<17} " + (f"{best['mode']} {best['level']:g} ({best['throughput_rps']:.1f} req/s, "
+                                      f"p99 {best['p99_ms']:.2f} ms)" if best else "none"))
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'args': {key: value for key, value in vars(args).items()},
+            'cpus': os.cpu_count(),
+            'configs': report
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
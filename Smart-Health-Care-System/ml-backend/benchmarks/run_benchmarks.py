@@ -0,0 +1,280 @@
+"""Reproducible training and inference benchmarks for the diabetes model.
+
+Run from the ml-backend directory:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --preset full --output bench.json --compare old.json
+
+Every input comes from the seeded generate_synthetic_data() in train_model.py,
+so two runs with the same arguments measure the same work. Each measurement
+is also taken for the extra-trees mode (splitter='random', no bootstrap) and
+for scikit-learn's RandomForestClassifier as a baseline; training results
+include accuracy on a held-out synthetic set.
+Results are written as JSON together with the git commit and library
+versions, and --compare prints the ratio against an earlier results file.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier as SklearnRandomForest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ingest import FEATURE_COLUMNS, LABEL_COLUMN
+from models.random_forest import RandomForestClassifier, DiabetesPredictor
+from train_model import generate_synthetic_data
+from validation import FEATURE_FIELDS, MIN_VALUES, MAX_VALUES
+
+PRESETS = {
+    'quick': {
+        'fit_rows': [1000, 5000],
+        'fit_estimators': [10, 50],
+        'inference_rows': 5000,
+        'batch_sizes': [1, 100, 1000],
+        'repeats': 200
+    },
+    'full': {
+        'fit_rows': [10000, 100000, 1000000],
+        'fit_estimators': [10, 100],
+        'inference_rows': 20000,
+        'batch_sizes': [1, 100, 10000],
+        'repeats': 1000
+    }
+}
+
+
+def synthetic(n_rows, seed):
+    df = generate_synthetic_data(n_rows, random_state=seed)
+    return df[FEATURE_COLUMNS].values.astype(float), df[LABEL_COLUMN].values.astype(int)
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(np.mean(samples))
+    }
+
+
+def time_calls(fn, inputs, repeats):
+    fn(inputs[0])
+    timings = []
+    for idx in range(repeats):
+        start = time.perf_counter()
+        fn(inputs[idx % len(inputs)])
+        timings.append(time.perf_counter() - start)
+    return percentiles(timings)
+
+
+def make_forests(n_estimators, max_depth, seed, n_jobs, max_bins):
+    return {
+        'custom': RandomForestClassifier(
+            n_estimators=n_estimators, max_depth=max_depth, random_state=seed, max_bins=max_bins, n_jobs=n_jobs
+        ),
+        'extra_trees': RandomForestClassifier(
+            n_estimators=n_estimators, max_depth=max_depth, random_state=seed, max_bins=max_bins, n_jobs=n_jobs,
+            splitter='random', bootstrap=False
+        ),
+        'sklearn': SklearnRandomForest(
+            n_estimators=n_estimators, max_depth=max_depth, max_features='sqrt', random_state=seed, n_jobs=n_jobs
+        )
+    }
+
+
+def bench_fit(config, args):
+    results = []
+    X_test, y_test = synthetic(10000, args.seed + 2)
+    for n_rows in config['fit_rows']:
+        X, y = synthetic(n_rows, args.seed)
+        for n_estimators in config['fit_estimators']:
+            forests = make_forests(n_estimators, args.max_depth, args.seed, args.n_jobs, args.max_bins)
+            for name, forest in forests.items():
+                start = time.perf_counter()
+                forest.fit(X, y)
+                seconds = time.perf_counter() - start
+                accuracy = float(np.mean(forest.predict(X_test) == y_test))
+                results.append({
+                    'implementation': name, 'rows': n_rows, 'n_estimators': n_estimators, 'seconds': seconds,
+                    'accuracy': accuracy
+                })
+                print(f"  fit {name:<11} rows={n_rows:>8} trees={n_estimators:>4} {seconds:>9.2f} s "
+                      f"accuracy={accuracy:.4f}")
+    return results
+
+
+def bench_inference(forests, config, args):
+    X, _ = synthetic(config['inference_rows'], args.seed + 1)
+    results = []
+    for name, forest in forests.items():
+        for batch_size in config['batch_sizes']:
+            batches = [X[start:start + batch_size] for start in range(0, len(X) - batch_size + 1, batch_size)]
+            repeats = max(5, config['repeats'] // max(1, batch_size // 100))
+            stats = time_calls(forest.predict_proba, batches, repeats)
+            stats.update({'implementation': name, 'batch_size': batch_size})
+            results.append(stats)
+            print(f"  predict_proba {name:<11} batch={batch_size:>6} "
+                  f"p50={stats['p50_ms']:>9.3f} ms p99={stats['p99_ms']:>9.3f} ms")
+    return results
+
+
+def bench_endpoint(predictor, config, args):
+    os.environ.setdefault('MODEL_WATCH', '0')
+    import app as service
+
+    # Measure uncached predictions without per-request log lines on stderr
+    service.swap_model(predictor)
+    service.prediction_cache.max_size = 0
+    service.logger.setLevel(logging.WARNING)
+    client = service.app.test_client()
+
+    # Clip to the request validation ranges so every call takes the prediction path
+    X, _ = synthetic(config['repeats'], args.seed + 2)
+    X = np.clip(X, MIN_VALUES, MAX_VALUES)
+    payloads = [dict(zip(FEATURE_FIELDS, map(float, row))) for row in X]
+
+    timings = []
+    for payload in payloads:
+        start = time.perf_counter()
+        response = client.post('/predict', json=payload)
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}: {response.get_json()}")
+
+    stats = percentiles(timings)
+    print(f"  /predict single row p50={stats['p50_ms']:.3f} ms p99={stats['p99_ms']:.3f} ms")
+    return stats
+
+
+def bench_memory(predictor):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in ('.joblib', '.rfm'):
+            path = os.path.join(tmp, 'model' + suffix)
+            predictor.save_model(path)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            DiabetesPredictor.load_model(path).predict_all(np.zeros((1, len(FEATURE_COLUMNS))))
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[suffix.lstrip('.')] = {
+                'file_bytes': os.path.getsize(path),
+                'peak_python_bytes': peak,
+                'load_seconds': seconds
+            }
+            print(f"  load {suffix:<8} file={os.path.getsize(path) / 1e6:.2f} MB "
+                  f"peak={peak / 1e6:.2f} MB load={seconds * 1000:.1f} ms")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nComparison against {previous_path} (commit {previous.get('commit')}); ratio = new / old")
+
+    def index(rows, keys, value):
+        return {tuple(row[key] for key in keys): row[value] for row in rows}
+
+    sections = [
+        ('fit', ['implementation', 'rows', 'n_estimators'], 'seconds'),
+        ('fit', ['implementation', 'rows', 'n_estimators'], 'accuracy'),
+        ('inference', ['implementation', 'batch_size'], 'p99_ms')
+    ]
+    for section, keys, value in sections:
+        old = index(previous.get(section, []), keys, value)
+        for key, new_value in index(current[section], keys, value).items():
+            if key in old and old[key]:
+                print(f"  {section:<10} {str(key):<40} {value}: {old[key]:.4g} -> {new_value:.4g} "
+                      f"({new_value / old[key]:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training and inference benchmarks")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--fit-rows', type=int, nargs='+', help="Override the preset's training row counts")
+    parser.add_argument('--fit-estimators', type=int, nargs='+', help="Override the preset's n_estimators values")
+    parser.add_argument('--max-depth', type=int, default=15)
+    parser.add_argument('--max-bins', type=int, default=None)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+    logging.getLogger('models.random_forest').setLevel(logging.WARNING)
+
+    config = dict(PRESETS[args.preset])
+    if args.fit_rows:
+        config['fit_rows'] = args.fit_rows
+    if args.fit_estimators:
+        config['fit_estimators'] = args.fit_estimators
+
+    print("Training benchmarks")
+    fit_results = bench_fit(config, args)
+
+    print("Inference benchmarks (100 trees trained on 10000 synthetic rows)")
+    X, y = synthetic(10000, args.seed)
+    forests = make_forests(100, args.max_depth, args.seed, args.n_jobs, args.max_bins)
+    for forest in forests.values():
+        forest.fit(X, y)
+    inference_results = bench_inference(forests, config, args)
+
+    predictor = DiabetesPredictor()
+    predictor.model = forests['custom']
+    predictor.is_trained = True
+    endpoint_results = bench_endpoint(predictor, config, args)
+
+    print("Model memory")
+    memory_results = bench_memory(predictor)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'preset': args.preset,
+        'config': dict(config, max_depth=args.max_depth, max_bins=args.max_bins, n_jobs=args.n_jobs, seed=args.seed),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'fit': fit_results,
+        'inference': inference_results,
+        'endpoint': endpoint_results,
+        'memory': memory_results
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Compress a trained diabetes model within an accuracy budget.
+
+Usage:
+    python compress_model.py --model diabetes_model.joblib --tolerance 0.005 \
+        --output diabetes_model_compressed.rfm
+
+The held-out set is the same stratified 20% split train_model.py evaluates on.
+It is split again: trees are chosen on the selection part (--selection-size)
+and the reported accuracy and log-loss come from the rest, which the
+selection never saw.
+"""
+import argparse
+import os
+
+import numpy as np
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.model_selection import train_test_split
+
+from ingest import load_dataset
+from models.compression import forest_stats, prune_forest, select_trees
+from models.random_forest import DiabetesPredictor
+
+
+def load_holdout(csv_path, test_size, selection_size):
+    """Return (X_select, y_select, X_eval, y_eval) from the held-out split"""
+    X, y = load_dataset(csv_path)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+    X_select, X_eval, y_select, y_eval = train_test_split(
+        X_test, y_test, train_size=selection_size, random_state=42, stratify=y_test
+    )
+    return X_select, y_select, X_eval, y_eval
+
+
+def print_stats(label, stats, model, X, y):
+    probabilities = model.predict_proba(X)
+    print(f"{label:<12} trees={stats['trees']:>4} nodes={stats['nodes']:>7} "
+          f"size={stats['size_bytes'] / 1e6:>6.2f} MB "
+          f"single={stats['single_row_ms']:>6.3f} ms batch({stats['batch_rows']})={stats['batch_ms']:>7.1f} ms "
+          f"accuracy={accuracy_score(y, np.argmax(probabilities, axis=1)):.4f} "
+          f"log_loss={log_loss(y, probabilities, labels=[0, 1]):.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and subset a trained forest within an accuracy budget")
+    parser.add_argument('--model', default='diabetes_model.joblib')
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diabetes.csv'))
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--selection-size', type=float, default=0.5,
+                        help="Fraction of the held-out set used to choose trees; the rest is for reporting")
+    parser.add_argument('--metric', choices=['accuracy', 'log_loss'], default='accuracy')
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help="Allowed drop in held-out accuracy (or increase in log-loss)")
+    parser.add_argument('--min-trees', type=int, default=1)
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help="Also truncate trees at this depth (changes predictions)")
+    parser.add_argument('--output', default='diabetes_model_compressed.rfm')
+    args = parser.parse_args()
+
+    predictor = DiabetesPredictor.load_model(args.model)
+    X_select, y_select, X_eval, y_eval = load_holdout(args.data, args.test_size, args.selection_size)
+
+    forest = predictor.model
+    before = forest_stats(forest, X_eval)
+
+    pruned = prune_forest(forest, max_depth=args.max_depth)
+    compressed, full_score, subset_score = select_trees(
+        pruned, X_select, y_select, metric=args.metric, tolerance=args.tolerance, min_trees=args.min_trees
+    )
+    after = forest_stats(compressed, X_eval)
+
+    print(f"Selection-set {args.metric} ({len(y_select)} rows): full forest {abs(full_score):.4f}, "
+          f"selected {len(compressed.trees)} trees {abs(subset_score):.4f}")
+    print(f"Evaluation set ({len(y_eval)} rows, not used for selection):")
+    print_stats('original', before, forest, X_eval, y_eval)
+    print_stats('compressed', after, compressed, X_eval, y_eval)
+
+    predictor.model = compressed
+    predictor.metadata = dict(
+        predictor.metadata,
+        compressed_from=os.path.basename(args.model),
+        compression={
+            'metric': args.metric, 'tolerance': args.tolerance, 'max_depth': args.max_depth,
+            'selection_size': args.selection_size
+        }
+    )
+    predictor.save_model(args.output)
+    print(f"Compressed model written to {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB)")
+
+
+if __name__ == '__main__':
+    main()
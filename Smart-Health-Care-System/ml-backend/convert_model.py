@@ -0,0 +1,36 @@
+"""Convert a joblib diabetes model into the compact memory-mappable format.
+
+Usage:
+    python convert_model.py diabetes_model.joblib diabetes_model.rfm
+"""
+import argparse
+import os
+import time
+
+from models.random_forest import COMPACT_MODEL_SUFFIX, DiabetesPredictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a joblib model to the compact model format")
+    parser.add_argument('source', help="Existing .joblib model")
+    parser.add_argument('target', nargs='?', help=f"Output path (default: source with {COMPACT_MODEL_SUFFIX})")
+    args = parser.parse_args()
+
+    target = args.target or os.path.splitext(args.source)[0] + COMPACT_MODEL_SUFFIX
+    if not target.endswith(COMPACT_MODEL_SUFFIX):
+        parser.error(f"target must end with {COMPACT_MODEL_SUFFIX}")
+
+    model = DiabetesPredictor.load_model(args.source)
+    model.save_model(target)
+
+    start = time.perf_counter()
+    DiabetesPredictor.load_model(target)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Converted {args.source} ({os.path.getsize(args.source) / 1e6:.2f} MB) "
+          f"-> {target} ({os.path.getsize(target) / 1e6:.2f} MB)")
+    print(f"Memory-mapped load time: {load_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Chunked CSV ingestion with a memory-mappable binary cache.
+
+The first run streams the CSV in chunks, drops rows with any missing or
+non-numeric value in a single vectorized pass and writes the cleaned
+features and labels as .npy files next to the CSV. Later runs memory-map
+those files instead of parsing the CSV again. The cache is rebuilt when
+the CSV's size or modification time changes.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = [
+    'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+    'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
+]
+LABEL_COLUMN = 'Outcome'
+
+CACHE_VERSION = 1
+DEFAULT_CHUNK_ROWS = 200000
+
+
+def _read_chunks(csv_path, chunk_rows, columns):
+    # Explicit float dtypes keep pandas on the fast C parser path; repeated
+    # header rows inside an export are read as NaN and dropped with the rest
+    return pd.read_csv(
+        csv_path, usecols=columns, chunksize=chunk_rows,
+        dtype={column: np.float64 for column in columns},
+        na_values={column: [column] for column in columns}
+    )
+
+
+def _clean(chunk):
+    """Drop every row with a missing or non-numeric value in one pass"""
+    values = chunk.to_numpy(dtype=np.float64)
+    values = values[np.isfinite(values).all(axis=1)]
+    return np.ascontiguousarray(values[:, :-1]), values[:, -1].astype(np.int32)
+
+
+def check_columns(csv_path):
+    """Raise ValueError if the CSV header lacks a feature or label column"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = [column for column in FEATURE_COLUMNS + [LABEL_COLUMN] if column not in header]
+    if missing:
+        raise ValueError(f"{csv_path} is missing required columns: {', '.join(missing)}")
+
+
+def iter_clean_chunks(csv_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield cleaned (X, y) arrays for each chunk of the CSV"""
+    columns = FEATURE_COLUMNS + [LABEL_COLUMN]
+    # Checked up front so a schema error is not mistaken for a parse error below
+    check_columns(csv_path)
+    parsed_rows = 0
+    try:
+        for chunk in _read_chunks(csv_path, chunk_rows, columns):
+            parsed_rows += len(chunk)
+            yield _clean(chunk[columns])
+        return
+    except ValueError:
+        logger.warning("Non-numeric values in %s, falling back to text parsing", csv_path)
+
+    # Resume after the rows already emitted, coercing every value from text
+    text_chunks = pd.read_csv(
+        csv_path, usecols=columns, chunksize=chunk_rows, dtype=str,
+        skiprows=lambda line: 0 < line <= parsed_rows
+    )
+    for chunk in text_chunks:
+        yield _clean(chunk[columns].apply(pd.to_numeric, errors='coerce'))
+
+
+def cache_paths(csv_path, cache_dir=None):
+    """Return the (features, labels, metadata) cache file paths for a CSV"""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    directory = cache_dir or os.path.dirname(os.path.abspath(csv_path))
+    prefix = os.path.join(directory, stem)
+    return prefix + '.features.npy', prefix + '.labels.npy', prefix + '.cache.json'
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(csv_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'features': FEATURE_COLUMNS,
+        'label': LABEL_COLUMN
+    }
+
+
+def _cache_is_fresh(csv_path, paths):
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    try:
+        with open(paths[2]) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    signature = _source_signature(csv_path)
+    return all(meta.get(key) == value for key, value in signature.items() if key != 'source')
+
+
+def build_cache(csv_path, cache_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stream the CSV into the .npy cache and return the number of rows kept.
+
+    Cleaned chunks are appended to raw scratch files so memory use stays at
+    one chunk regardless of the export size; the .npy files are written from
+    those at the end and the metadata file is written last, so an
+    interrupted build is never mistaken for a valid cache.
+    """
+    features_path, labels_path, meta_path = cache_paths(csv_path, cache_dir)
+    signature = _source_signature(csv_path)
+    n_features = len(FEATURE_COLUMNS)
+    n_rows = 0
+
+    try:
+        with open(features_path + '.part', 'wb') as features_file, open(labels_path + '.part', 'wb') as labels_file:
+            for X, y in iter_clean_chunks(csv_path, chunk_rows):
+                X.tofile(features_file)
+                y.tofile(labels_file)
+                n_rows += len(y)
+
+        if n_rows == 0:
+            raise ValueError(f"No valid rows in {csv_path}")
+        for path, dtype, shape in (
+            (features_path, np.float64, (n_rows, n_features)),
+            (labels_path, np.int32, (n_rows,))
+        ):
+            target = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=dtype, shape=shape)
+            target[:] = np.memmap(path + '.part', dtype=dtype, mode='r', shape=shape)
+            target.flush()
+            del target
+            os.replace(path + '.tmp', path)
+    finally:
+        for path in (features_path, labels_path):
+            if os.path.exists(path + '.part'):
+                os.remove(path + '.part')
+
+    signature['rows'] = n_rows
+    with open(meta_path, 'w') as f:
+        json.dump(signature, f, indent=2)
+    logger.info("Cached %d rows from %s", n_rows, csv_path)
+    return n_rows
+
+
+def load_dataset(csv_path, cache_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS, use_cache=True, refresh=False):
+    """Return (X, y) for a diabetes CSV export.
+
+    With use_cache the arrays are memory-mapped read-only from the .npy
+    cache, which is (re)built first when missing, stale or refresh is set.
+    Without it the CSV is streamed and the chunks are concatenated in memory.
+    """
+    if not use_cache:
+        chunks = list(iter_clean_chunks(csv_path, chunk_rows))
+        if not chunks:
+            raise ValueError(f"No valid rows in {csv_path}")
+        return np.concatenate([X for X, _ in chunks]), np.concatenate([y for _, y in chunks])
+
+    paths = cache_paths(csv_path, cache_dir)
+    if refresh or not _cache_is_fresh(csv_path, paths):
+        build_cache(csv_path, cache_dir, chunk_rows)
+    else:
+        logger.info("Using cached dataset for %s", csv_path)
+
+    features_path, labels_path, _ = paths
+    return np.load(features_path, mmap_mode='r'), np.load(labels_path, mmap_mode='r')
@@ -0,0 +1,86 @@
+"""Dynamic micro-batching of concurrent single-row predictions.
+
+Requests put their feature row on a queue and wait on a Future. One worker
+thread takes the first waiting row, keeps collecting rows until the batch
+is full or max_wait_ms has passed, scores the whole batch with a single
+call and hands every caller its own row of the result. Rows submitted with
+different contexts (e.g. different model instances) are scored separately.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        # predict_fn(X, context) must return one result per row of X
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, features, context=None):
+        """Queue one feature row; the returned Future resolves to its result"""
+        future = Future()
+        self._queue.put((np.asarray(features, dtype=float), context, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window closed: still take rows that are already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+
+            for items in groups.values():
+                futures = [future for _, _, future in items]
+                try:
+                    results = self.predict_fn(np.stack([features for features, _, _ in items]), items[0][1])
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                else:
+                    for future, result in zip(futures, results):
+                        future.set_result(result)
+
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'queued': self._queue.qsize()
+            }
@@ -0,0 +1,197 @@
+"""Lazily loaded, memory-budgeted registry of named model versions.
+
+Models live under a root directory as <root>/<name>/<version>.rfm (or
+.joblib), e.g. model_store/pregnancy-cohort/2024-06-01.rfm. A request
+names a model and optionally a version; without a version the most recently
+modified artifact of that model is served. Versions are treated as
+immutable: deploy a new version as a new file instead of overwriting one.
+
+A model is loaded and warmed on first use. Concurrent requests for a model
+that is still loading wait for that one load. The registry tracks the
+bytes held by each model's node arrays. When the total exceeds the memory
+budget, it evicts the least recently used models until it fits again. The
+model just loaded is never evicted. Requests that already hold an evicted
+model finish on it.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+
+import numpy as np
+
+from model_watcher import WARMUP_ROW
+from models.random_forest import COMPACT_MODEL_SUFFIX, DiabetesPredictor
+
+logger = logging.getLogger(__name__)
+
+# Artifact suffixes in order of preference when a version exists in both formats
+MODEL_SUFFIXES = [COMPACT_MODEL_SUFFIX, '.joblib']
+
+# Model names and versions become path components, so only allow plain names
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+
+
+class UnknownModelError(KeyError):
+    """No artifact exists for the requested model name or version"""
+
+
+class ModelRegistry:
+    def __init__(self, root, memory_budget_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.memory_budget_bytes = memory_budget_bytes
+        # (name, version) -> entry dict, least recently used first
+        self._entries = OrderedDict()
+        # (name, version) -> Future of the load in progress
+        self._loading = {}
+        # Reentrant so resident_bytes can be read both inside and outside locked sections
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+
+    def _artifact(self, name, version):
+        for suffix in MODEL_SUFFIXES:
+            path = os.path.join(self.root, name, version + suffix)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def versions(self, name):
+        """Versions of a model available on disk, newest artifact first"""
+        try:
+            files = os.listdir(os.path.join(self.root, name))
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        modified = {}
+        for filename in files:
+            for suffix in MODEL_SUFFIXES:
+                if filename.endswith(suffix):
+                    path = os.path.join(self.root, name, filename)
+                    version = filename[:-len(suffix)]
+                    modified[version] = max(modified.get(version, 0), os.stat(path).st_mtime_ns)
+        return sorted(modified, key=lambda version: (modified[version], version), reverse=True)
+
+    def resolve(self, name, version=None):
+        """Validate name and version and return the version to serve"""
+        for value in (name, version):
+            if value is not None and not NAME_PATTERN.match(value):
+                raise ValueError(f"invalid model name or version: {value!r}")
+        if version is None:
+            versions = self.versions(name)
+            if not versions:
+                raise UnknownModelError(f"unknown model: {name}")
+            return versions[0]
+        return version
+
+    def get(self, name, version=None):
+        """Return (predictor, version), loading the model if it is not resident"""
+        version = self.resolve(name, version)
+        key = (name, version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry['hits'] += 1
+                entry['last_used'] = time.time()
+                return entry['predictor'], version
+
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+
+        if not owner:
+            # Someone else is loading this model: share their result (or error)
+            predictor = future.result()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry['hits'] += 1
+            return predictor, version
+
+        try:
+            predictor = self._load(name, version)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+                self.load_failures += 1
+            future.set_exception(e)
+            raise
+        future.set_result(predictor)
+        return predictor, version
+
+    def _load(self, name, version):
+        path = self._artifact(name, version)
+        if path is None:
+            raise UnknownModelError(f"unknown model version: {name}@{version}")
+
+        start = time.perf_counter()
+        predictor = DiabetesPredictor.load_model(path)
+        # Warm-up builds the packed arrays, so they are counted in the model's size
+        predictor.predict_all(np.array(WARMUP_ROW, dtype=float))
+        load_seconds = time.perf_counter() - start
+
+        entry = {
+            'predictor': predictor,
+            'path': path,
+            'bytes': predictor.model.nbytes,
+            'hits': 1,
+            'loaded_at': datetime.now().isoformat(),
+            'load_seconds': load_seconds,
+            'last_used': time.time()
+        }
+        with self._lock:
+            self._entries[(name, version)] = entry
+            del self._loading[(name, version)]
+            self.loads += 1
+            self._evict()
+        logger.info(f"Model {name}@{version} loaded in {load_seconds * 1000:.1f} ms "
+                    f"({entry['bytes'] / 1e6:.1f} MB)")
+        return predictor
+
+    def _evict(self):
+        """Drop least recently used models until the budget holds; caller holds the lock"""
+        while len(self._entries) > 1 and self.resident_bytes > self.memory_budget_bytes:
+            (name, version), entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicted model {name}@{version} ({entry['bytes'] / 1e6:.1f} MB, {entry['hits']} hits)")
+        if self.resident_bytes > self.memory_budget_bytes:
+            logger.warning(f"Model registry holds {self.resident_bytes / 1e6:.1f} MB, "
+                           f"over its {self.memory_budget_bytes / 1e6:.1f} MB budget")
+
+    @property
+    def resident_bytes(self):
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._entries.values())
+
+    def status(self):
+        with self._lock:
+            models = [
+                {
+                    'name': name,
+                    'version': version,
+                    'bytes': entry['bytes'],
+                    'hits': entry['hits'],
+                    'loaded_at': entry['loaded_at'],
+                    'load_seconds': entry['load_seconds'],
+                    'last_used': datetime.fromtimestamp(entry['last_used']).isoformat()
+                }
+                # Most recently used first
+                for (name, version), entry in reversed(self._entries.items())
+            ]
+            return {
+                'root': self.root,
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'resident_bytes': self.resident_bytes,
+                'models': models,
+                'loading': [f"{name}@{version}" for name, version in self._loading],
+                'loads': self.loads,
+                'load_failures': self.load_failures,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,154 @@
+"""Background loading and zero-downtime hot-swapping of the served model.
+
+ModelManager polls the candidate model artifacts. When the preferred
+artifact appears or changes, and its size and mtime are the same on two
+consecutive polls, the manager loads it in its own thread and runs a warm-up
+prediction. It then hands the new predictor to on_swap. The caller swaps its
+global reference in one assignment, so requests that already hold the old
+predictor finish on it. An artifact that fails to load is logged once and
+skipped until its size or mtime changes; the active model keeps serving.
+
+Deploy new models by writing to a temporary file and renaming it over the
+artifact. Compact models are memory-mapped, and an in-place overwrite would
+change the pages under the model that is still serving.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from models.random_forest import DiabetesPredictor
+
+logger = logging.getLogger(__name__)
+
+# Typical patient used to warm a freshly loaded model before it takes traffic
+WARMUP_ROW = [[2, 120, 70, 20, 80, 25.0, 0.5, 30]]
+
+
+class ModelManager:
+    def __init__(self, model_paths, on_swap, poll_interval=5.0):
+        # Candidate artifacts in order of preference; the first existing one is served
+        self.model_paths = model_paths
+        self.on_swap = on_swap
+        self.poll_interval = poll_interval
+        self._load_lock = threading.Lock()
+        self._thread = None
+        self._candidate = None
+        # (path, signature) of the last artifact that failed to load; not retried until it changes
+        self._failed = None
+        self.active = None
+        self.pending = None
+        self.last_error = None
+
+    def _artifact(self):
+        for path in self.model_paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            return path, (stat.st_mtime_ns, stat.st_size)
+        return None, None
+
+    @staticmethod
+    def _version(path, signature):
+        modified = datetime.fromtimestamp(signature[0] / 1e9).isoformat(timespec='seconds')
+        return f"{os.path.basename(path)}@{modified}"
+
+    def load(self):
+        """Load, warm and swap in the preferred artifact; returns True on success"""
+        path, signature = self._artifact()
+        if path is None:
+            logger.warning(f"Model file not found: {self.model_paths[-1]}")
+            logger.info("Please train the model first by running: python train_model.py")
+            return False
+        return self._load(path, signature)
+
+    def _load(self, path, signature):
+        with self._load_lock:
+            if self.active and self.active['path'] == path and self.active['signature'] == signature:
+                return True
+
+            version = self._version(path, signature)
+            self.pending = {'version': version, 'path': path, 'started_at': datetime.now().isoformat()}
+            start = time.perf_counter()
+            try:
+                predictor = DiabetesPredictor.load_model(path)
+                predictor.predict_all(np.array(WARMUP_ROW, dtype=float))
+            except Exception as e:
+                logger.error(f"Error loading model: {e}")
+                self.last_error = {'version': version, 'error': str(e), 'at': datetime.now().isoformat()}
+                self._failed = (path, signature)
+                self.pending = None
+                return False
+
+            load_seconds = time.perf_counter() - start
+            self.on_swap(predictor)
+            self.active = {
+                'version': version,
+                'path': path,
+                'signature': signature,
+                'trained_at': predictor.metadata.get('timestamp'),
+                'loaded_at': datetime.now().isoformat(),
+                'load_seconds': load_seconds
+            }
+            self.pending = None
+            self._failed = None
+            logger.info(f"Model {version} loaded and swapped in after {load_seconds * 1000:.1f} ms")
+            return True
+
+    def poll(self):
+        path, signature = self._artifact()
+        if path is None:
+            return
+        if self.active and (path, signature) == (self.active['path'], self.active['signature']):
+            self._candidate = None
+            return
+        if (path, signature) == self._failed:
+            # Already failed to load; wait for the file to change
+            self._candidate = None
+            return
+
+        if self.active is None or (path, signature) == self._candidate:
+            self._load(path, signature)
+            self._candidate = None
+        else:
+            # Wait one more poll so a file that is still being written is not loaded
+            self._candidate = (path, signature)
+            self.pending = {'version': self._version(path, signature), 'path': path, 'started_at': None}
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        """Load the model in the background and keep watching for new artifacts"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+
+    @property
+    def loading(self):
+        """True while no model is active yet but one is (or is about to be) loading"""
+        if self.active is not None:
+            return False
+        if self.pending is not None:
+            return True
+        return self._thread is not None and self.last_error is None and self._artifact()[0] is not None
+
+    def status(self):
+        active = dict(self.active) if self.active else None
+        if active:
+            active.pop('signature')
+        return {
+            'active': active,
+            'pending': self.pending,
+            'last_error': self.last_error,
+            'poll_interval_seconds': self.poll_interval
+        }
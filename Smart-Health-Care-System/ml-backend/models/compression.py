@@ -0,0 +1,146 @@
+"""Post-training compression of a fitted RandomForestClassifier.
+
+Two stages, both driven by compress_model.py:
+
+* prune_forest() collapses every subtree whose leaves all predict the same
+  class into a single leaf (optionally also truncating trees at a depth).
+  Without truncation this never changes a tree's predictions.
+* select_trees() greedily picks the smallest subset of trees whose
+  held-out accuracy or log-loss stays within a tolerance of the full forest.
+"""
+import time
+
+import numpy as np
+
+from models.random_forest import LEAF, DecisionTree, RandomForestClassifier
+
+
+def _node_depths(tree):
+    depth = np.zeros(tree.n_nodes, dtype=np.int32)
+    # Children are always stored after their parent
+    for node in range(tree.n_nodes):
+        if tree.feature[node] != LEAF:
+            depth[tree.children_left[node]] = depth[node] + 1
+            depth[tree.children_right[node]] = depth[node] + 1
+    return depth
+
+
+def prune_tree(tree, max_depth=None):
+    """Return a new DecisionTree with uniform subtrees merged into leaves"""
+    labels = np.argmax(tree.value, axis=1)
+    is_leaf = tree.feature == LEAF
+    if max_depth is not None:
+        is_leaf = is_leaf | (_node_depths(tree) >= max_depth)
+
+    # uniform[node] is the class every leaf below node predicts, or -1 if they disagree
+    uniform = np.full(tree.n_nodes, -1)
+    for node in range(tree.n_nodes - 1, -1, -1):
+        if is_leaf[node]:
+            uniform[node] = labels[node]
+        else:
+            left_label = uniform[tree.children_left[node]]
+            if left_label != -1 and left_label == uniform[tree.children_right[node]]:
+                uniform[node] = left_label
+
+    # Re-emit the surviving nodes in pre-order so children still follow parents
+    old_ids, new_left, new_right = [], [], []
+    stack = [(0, -1, False)]
+    while stack:
+        node, parent, is_right = stack.pop()
+        new_id = len(old_ids)
+        old_ids.append(node)
+        new_left.append(LEAF)
+        new_right.append(LEAF)
+        if parent != -1:
+            (new_right if is_right else new_left)[parent] = new_id
+        if uniform[node] == -1:
+            stack.append((tree.children_right[node], new_id, True))
+            stack.append((tree.children_left[node], new_id, False))
+
+    old_ids = np.array(old_ids)
+    collapsed = uniform[old_ids] != -1
+
+    pruned = DecisionTree(max_depth=tree.max_depth if max_depth is None else min(max_depth, tree.max_depth))
+    pruned.feature = np.where(collapsed, LEAF, tree.feature[old_ids]).astype(np.int32)
+    pruned.threshold = np.where(collapsed, np.nan, tree.threshold[old_ids])
+    pruned.children_left = np.array(new_left, dtype=np.int32)
+    pruned.children_right = np.array(new_right, dtype=np.int32)
+    pruned.value = np.array(tree.value[old_ids], dtype=np.float64)
+    return pruned
+
+
+def _new_forest(forest, trees):
+    compressed = RandomForestClassifier(**forest.get_params())
+    compressed.n_estimators = len(trees)
+    compressed.trees = list(trees)
+    # Keep the seed cursor so trees grown later do not reuse the original trees' seeds
+    compressed.n_trees_grown = forest.n_trees_grown
+    return compressed
+
+
+def prune_forest(forest, max_depth=None):
+    return _new_forest(forest, [prune_tree(tree, max_depth) for tree in forest.trees])
+
+
+def _score(votes, y, metric):
+    """Higher is better for both metrics (log-loss is negated)"""
+    if metric == 'accuracy':
+        return np.mean(np.argmax(votes, axis=-1) == y, axis=-1)
+    probabilities = votes / votes.sum(axis=-1, keepdims=True)
+    true_class = np.take_along_axis(probabilities, np.broadcast_to(y[:, None], probabilities.shape[:-1] + (1,)), -1)
+    return np.mean(np.log(np.clip(true_class[..., 0], 1e-15, 1)), axis=-1)
+
+
+def select_trees(forest, X, y, metric='accuracy', tolerance=0.005, min_trees=1):
+    """Greedily add the tree that most improves the held-out score until it is
+    within tolerance of the full forest. Returns (forest, full_score, subset_score)."""
+    if metric not in ('accuracy', 'log_loss'):
+        raise ValueError("metric must be 'accuracy' or 'log_loss'")
+    y = np.asarray(y)
+
+    packed = forest._pack_trees()
+    tree_labels = packed['leaf_label'][forest.apply(X)]
+    tree_votes = np.eye(packed['n_classes'])[tree_labels]
+
+    full_score = _score(tree_votes.sum(axis=0), y, metric)
+    target = full_score - tolerance
+
+    chosen = []
+    remaining = list(range(len(forest.trees)))
+    votes = np.zeros(tree_votes.shape[1:])
+    score = -np.inf
+    while remaining and (len(chosen) < min_trees or score < target):
+        candidate_scores = _score(votes[None] + tree_votes[remaining], y, metric)
+        best = int(np.argmax(candidate_scores))
+        score = candidate_scores[best]
+        votes += tree_votes[remaining[best]]
+        chosen.append(remaining.pop(best))
+
+    # Keep the original tree order so vote tie-breaking stays stable
+    subset = _new_forest(forest, [forest.trees[idx] for idx in sorted(chosen)])
+    return subset, full_score, score
+
+
+def forest_stats(forest, X, repeats=200):
+    """Node count, packed size and single-row / batch latency of a forest"""
+    arrays = forest.to_arrays()
+    X = np.asarray(X, dtype=float)
+
+    forest.predict_all(X[:1])
+    start = time.perf_counter()
+    for idx in range(repeats):
+        forest.predict_all(X[idx % len(X):idx % len(X) + 1])
+    single_ms = (time.perf_counter() - start) / repeats * 1000
+
+    start = time.perf_counter()
+    forest.predict_all(X)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'trees': len(forest.trees),
+        'nodes': int(len(arrays['feature'])),
+        'size_bytes': int(sum(array.nbytes for array in arrays.values())),
+        'single_row_ms': single_ms,
+        'batch_ms': batch_ms,
+        'batch_rows': len(X)
+    }
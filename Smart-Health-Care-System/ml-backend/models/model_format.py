@@ -0,0 +1,97 @@
+"""Versioned binary container for model node arrays.
+
+Layout of a compact model file:
+
+    8 bytes   magic b'RFMODEL\\0'
+    8 bytes   little-endian uint64 length of the JSON header
+    N bytes   UTF-8 JSON header (format version, metadata, array table)
+    ...       raw C-contiguous arrays, each starting on a 64-byte boundary
+
+Because the arrays are stored raw, load_arrays() can memory-map the file:
+every process that loads the same model shares one physical copy of the
+node arrays and loading costs no more than reading the header.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'RFMODEL\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_compact_model(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def save_arrays(filepath, arrays, header=None):
+    """Write arrays (dict name -> ndarray) plus a JSON-serializable header"""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header = dict(header or {}, format_version=FORMAT_VERSION)
+
+    # The array offsets depend on the header size, which depends on the offsets:
+    # lay the data out after a generously sized header and re-encode until it fits
+    data_start = ALIGNMENT
+    while True:
+        table = {}
+        offset = data_start
+        for name, array in arrays.items():
+            table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _aligned(offset + array.nbytes)
+        header['arrays'] = table
+        encoded = json.dumps(header).encode('utf-8')
+        prefix_size = len(MAGIC) + 8 + len(encoded)
+        if prefix_size <= data_start:
+            break
+        data_start = _aligned(prefix_size)
+
+    # Write beside the target and rename it into place: the file being replaced
+    # may be memory-mapped (even by the arrays being saved), and truncating it
+    # would pull the pages out from under every process serving it
+    tmp_path = str(filepath) + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(encoded)))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.write(b'\0' * (table[name]['offset'] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_arrays(filepath, mmap=True):
+    """Return (header, arrays); with mmap=True the arrays are read-only views of the file"""
+    with open(filepath, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filepath} is not a compact model file")
+        (header_size,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size).decode('utf-8'))
+
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format version: {header.get('format_version')}")
+
+    if mmap:
+        buffer = np.memmap(filepath, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(filepath, dtype=np.uint8)
+
+    arrays = {}
+    for name, spec in header.pop('arrays').items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = spec['offset']
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+    return header, arrays
@@ -1,22 +1,162 @@
 import numpy as np
-from collections import Counter
 import joblib
+from joblib import Parallel, delayed
 from datetime import datetime
 import logging
+import os
+import sys
+import time
+from models.model_format import is_compact_model, load_arrays, save_arrays
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
 
 logger = logging.getLogger(__name__)
+
+# Marks a leaf in DecisionTree.feature / children_left / children_right
+LEAF = -1
+
+# Most bins FeatureBinner allows; bin indices are stored as uint8
+MAX_BINS = 255
+
+# File suffix that makes DiabetesPredictor.save_model write the compact format
+COMPACT_MODEL_SUFFIX = '.rfm'
+
+# Packed forest arrays written to and memory-mapped from compact model files
+PACKED_ARRAYS = [
+    'tree_offset', 'feature', 'threshold', 'children_left', 'children_right', 'value', 'leaf_label'
+]
+
+
+def _peak_rss_bytes():
+    """Peak resident memory of the current process, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
 feature_names = [
     'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
     'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
 ]
 
 
+class FeatureBinner:
+    """Quantizes each feature into at most max_bins quantile bins stored as uint8.
+
+    Bin b of feature f holds the values in (bin_edges[f][b - 1], bin_edges[f][b]],
+    so a split "bin <= b" on binned data is the same as "value <= bin_edges[f][b]"
+    on raw data and trees trained on bins can predict on raw input.
+    """
+
+    def __init__(self, max_bins=MAX_BINS):
+        if not 2 <= max_bins <= MAX_BINS:
+            raise ValueError(f"max_bins must be between 2 and {MAX_BINS}")
+        self.max_bins = max_bins
+        self.bin_edges = []
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=float)
+        self.bin_edges = []
+        for feature_idx in range(X.shape[1]):
+            unique_values = np.unique(X[:, feature_idx])
+            if len(unique_values) <= self.max_bins:
+                # Few distinct values: one bin per value keeps splits exact
+                edges = unique_values[:-1]
+            else:
+                quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+                edges = np.unique(np.quantile(X[:, feature_idx], quantiles, method='lower'))
+            self.bin_edges.append(edges)
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=float)
+        X_binned = np.empty(X.shape, dtype=np.uint8)
+        for feature_idx, edges in enumerate(self.bin_edges):
+            X_binned[:, feature_idx] = np.searchsorted(edges, X[:, feature_idx], side='left')
+        return X_binned
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+
 class DecisionTree:
-    def __init__(self, max_depth=10, min_samples_split=2, max_features=None):
+    def __init__(self, max_depth=10, min_samples_split=2, max_features=None, bin_edges=None,
+                 random_state=None, splitter='best'):
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
         self.max_features = max_features
-        self.tree = None
+        # 'best' scores every threshold; 'random' draws one per feature (extremely randomized trees)
+        self.splitter = splitter
+        # When set, fit() expects FeatureBinner output and searches splits on histograms
+        self.bin_edges = bin_edges
+        # Seed (int or SeedSequence) for this tree's own Generator; never the global np.random
+        self.random_state = random_state
+
+        # Flat node arrays, filled by fit(). Node 0 is the root; leaves have
+        # feature == LEAF and value holds the training class counts of every node.
+        self.feature = None
+        self.threshold = None
+        self.children_left = None
+        self.children_right = None
+        self.value = None
+
+    def __setstate__(self, state):
+        # Models pickled before the flat layout store trees as nested dicts
+        legacy_tree = state.pop('tree', None)
+        state.setdefault('bin_edges', None)
+        state.setdefault('random_state', None)
+        state.setdefault('splitter', 'best')
+        self.__dict__.update(state)
+        if isinstance(legacy_tree, dict):
+            self._compile_dict_tree(legacy_tree)
+
+    def _compile_dict_tree(self, tree):
+        """Convert a nested-dict tree into the flat node arrays"""
+        nodes = []
+
+        def add(node):
+            node_id = len(nodes)
+            nodes.append(None)
+            if node['type'] == 'leaf':
+                nodes[node_id] = (LEAF, np.nan, LEAF, LEAF, int(node['value']))
+            else:
+                left = add(node['left'])
+                right = add(node['right'])
+                nodes[node_id] = (int(node['feature']), float(node['threshold']), left, right, None)
+            return node_id
+
+        add(tree)
+        n_classes = max(node[4] for node in nodes if node[4] is not None) + 1
+
+        self.feature = np.array([node[0] for node in nodes], dtype=np.int32)
+        self.threshold = np.array([node[1] for node in nodes], dtype=np.float64)
+        self.children_left = np.array([node[2] for node in nodes], dtype=np.int32)
+        self.children_right = np.array([node[3] for node in nodes], dtype=np.int32)
+
+        # Dict trees only kept leaf labels: count one vote per leaf and let each
+        # split hold the sum of its children (children always follow their parent)
+        self.value = np.zeros((len(nodes), n_classes))
+        for node_id in range(len(nodes) - 1, -1, -1):
+            if self.feature[node_id] == LEAF:
+                self.value[node_id, nodes[node_id][4]] = 1
+            else:
+                self.value[node_id] = (
+                    self.value[self.children_left[node_id]] + self.value[self.children_right[node_id]]
+                )
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _pad_classes(self, n_classes):
+        if self.value.shape[1] < n_classes:
+            padding = np.zeros((self.value.shape[0], n_classes - self.value.shape[1]))
+            self.value = np.hstack([self.value, padding])
 
     def _gini_impurity(self, y):
         if len(y) == 0:
@@ -24,146 +164,865 @@ class DecisionTree:
         proportions = np.bincount(y) / len(y)
         return 1 - np.sum(proportions ** 2)
 
-    def _best_split(self, X, y):
+    def _record(self, name, value):
+        # Training statistics are only gathered when fit() was given a stats dict
+        if self._stats is not None:
+            self._stats[name] += value
+
+    def _clock(self):
+        # Phase start time, or None so uninstrumented fits skip the timer calls
+        return time.perf_counter() if self._stats is not None else None
+
+    def _record_time(self, name, start):
+        if start is not None:
+            self._stats[name] += time.perf_counter() - start
+
+    def _candidate_features(self, n_features):
+        if self.max_features:
+            return self._rng.choice(n_features, min(self.max_features, n_features), replace=False)
+        return range(n_features)
+
+    def _best_split(self, rows):
+        """Best (feature, threshold, gain) over the training rows at a node.
+
+        rows index the shared training matrix and each row counts as many
+        times as its sample weight, exactly as if it had been duplicated.
+        """
         best_gain = -1
         best_feature = None
         best_threshold = None
 
-        n_features = X.shape[1]
-        if self.max_features:
-            feature_indices = np.random.choice(n_features, min(self.max_features, n_features), replace=False)
-        else:
-            feature_indices = range(n_features)
+        n_features = self._X.shape[1]
+        feature_indices = self._candidate_features(n_features)
 
-        for feature_idx in feature_indices:
-            X_column = X[:, feature_idx]
-            thresholds = np.unique(X_column)
+        # Parent impurity and class totals do not depend on the candidate split
+        weighted_one_hot = np.eye(self.n_classes)[self._y[rows]] * self._weight[rows, None]
+        total_counts = weighted_one_hot.sum(axis=0)
+        n_samples = total_counts.sum()
+        parent_gini = 1 - np.sum((total_counts / n_samples) ** 2)
 
-            for threshold in thresholds:
-                left_mask = X_column <= threshold
-                right_mask = ~left_mask
+        for feature_idx in feature_indices:
+            # Sort the column once, then sweep cumulative class counts so that
+            # every threshold is scored in O(1)
+            column = self._X[rows, feature_idx]
+            order = np.argsort(column, kind='stable')
+            sorted_values = column[order]
 
-                if np.sum(left_mask) == 0 or np.sum(right_mask) == 0:
-                    continue
+            # A threshold is a unique value with at least one larger value after it,
+            # i.e. the last position of each run that is followed by a bigger value
+            split_positions = np.nonzero(sorted_values[:-1] < sorted_values[1:])[0]
+            if len(split_positions) == 0:
+                continue
 
-                parent_gini = self._gini_impurity(y)
-                n = len(y)
-                n_left, n_right = np.sum(left_mask), np.sum(right_mask)
+            gini_start = self._clock()
+            left_counts = np.cumsum(weighted_one_hot[order], axis=0)[split_positions]
+            right_counts = total_counts - left_counts
+            n_left = left_counts.sum(axis=1)
+            n_right = n_samples - n_left
 
-                left_gini = self._gini_impurity(y[left_mask])
-                right_gini = self._gini_impurity(y[right_mask])
+            left_gini = 1 - np.sum((left_counts / n_left[:, None]) ** 2, axis=1)
+            right_gini = 1 - np.sum((right_counts / n_right[:, None]) ** 2, axis=1)
 
-                child_gini = (n_left / n) * left_gini + (n_right / n) * right_gini
-                gain = parent_gini - child_gini
+            child_gini = (n_left / n_samples) * left_gini + (n_right / n_samples) * right_gini
+            gains = parent_gini - child_gini
+            self._record_time('gini_seconds', gini_start)
+            self._record('thresholds_evaluated', len(split_positions))
 
-                if gain > best_gain:
-                    best_gain = gain
-                    best_feature = feature_idx
-                    best_threshold = threshold
+            # argmax keeps the smallest threshold on ties, matching a left-to-right scan
+            best_idx = np.argmax(gains)
+            if gains[best_idx] > best_gain:
+                best_gain = gains[best_idx]
+                best_feature = feature_idx
+                best_threshold = sorted_values[split_positions[best_idx]]
 
         return best_feature, best_threshold, best_gain
 
-    def _build_tree(self, X, y, depth=0):
-        n_samples = X.shape[0]
-        n_labels = len(np.unique(y))
+    def _random_split(self, rows, class_counts):
+        """Extremely randomized split: one uniform threshold per candidate feature.
+
+        Features are drawn in random order, skipping ones that are constant
+        at this node, until max_features have a threshold; the best of those
+        by Gini gain wins. Costs O(rows x max_features) with no sorting. On
+        binned data thresholds are whole bins and are returned as bin indices.
+        """
+        n_features = self._X.shape[1]
+        n_candidates = min(self.max_features or n_features, n_features)
+        order = self._rng.permutation(n_features)
+        # Candidate columns gathered feature-major, one row of X_node per feature
+        features = order[:n_candidates]
+        X_node = np.stack([self._X[rows, feature] for feature in features])
+        low, high = X_node.min(axis=1), X_node.max(axis=1)
+
+        if not np.all(low < high):
+            # Some candidates are constant here: draw replacements from the remaining features
+            X_node = np.stack([self._X[rows, feature] for feature in order])
+            low, high = X_node.min(axis=1), X_node.max(axis=1)
+            keep = np.flatnonzero(low < high)[:n_candidates]
+            if len(keep) == 0:
+                return None, None, -1
+            features, X_node, low, high = order[keep], X_node[keep], low[keep], high[keep]
+
+        if self.bin_edges is not None:
+            thresholds = self._rng.integers(low, high)
+        else:
+            thresholds = self._rng.uniform(low, high)
+
+        # Weighted class counts left of every candidate threshold with a single bincount
+        gini_start = self._clock()
+        n_classes = self.n_classes
+        left_weights = (X_node <= thresholds[:, None]) * self._weight[rows]
+        flat_index = np.arange(len(features))[:, None] * n_classes + self._y[rows]
+        left_counts = np.bincount(
+            flat_index.ravel(), weights=left_weights.ravel(), minlength=len(features) * n_classes
+        ).reshape(len(features), n_classes)
+        right_counts = class_counts - left_counts
+        n_samples = class_counts.sum()
+        n_left = left_counts.sum(axis=1)
+        n_right = n_samples - n_left
+
+        # Every threshold keeps the column minimum on the left, but a float draw
+        # can round up to the maximum and leave the right side empty
+        valid = n_right > 0
+        if not np.any(valid):
+            return None, None, -1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Gini gain up to the parent impurity: weighted sum of squared child class counts
+            scores = (left_counts ** 2).sum(axis=1) / n_left + (right_counts ** 2).sum(axis=1) / n_right
+        scores[~valid] = -np.inf
+        self._record_time('gini_seconds', gini_start)
+        self._record('thresholds_evaluated', len(features))
+
+        best_idx = np.argmax(scores)
+        gain = (scores[best_idx] - (class_counts ** 2).sum() / n_samples) / n_samples
+        return features[best_idx], thresholds[best_idx], gain
+
+    def _histogram(self, rows):
+        # Weighted class counts per (feature, bin) for all features with a single bincount
+        start = self._clock()
+        n_features = self._X.shape[1]
+        bins_per_feature = self.n_bins * self.n_classes
+        flat_index = (
+            np.arange(n_features) * bins_per_feature
+            + self._X[rows].astype(np.intp) * self.n_classes
+            + self._y[rows, None]
+        )
+        counts = np.bincount(
+            flat_index.ravel(), weights=np.repeat(self._weight[rows], n_features),
+            minlength=n_features * bins_per_feature
+        )
+        self._record_time('histogram_seconds', start)
+        return counts.reshape(n_features, self.n_bins, self.n_classes)
+
+    def _best_split_binned(self, histogram):
+        best_gain = -1
+        best_feature = None
+        best_bin = None
+
+        n_features = histogram.shape[0]
+        feature_indices = self._candidate_features(n_features)
+
+        total_counts = histogram[0].sum(axis=0)
+        n_samples = total_counts.sum()
+        parent_gini = 1 - np.sum((total_counts / n_samples) ** 2)
+
+        for feature_idx in feature_indices:
+            # Threshold bin b sends bins 0..b left; the last bin can never split
+            gini_start = self._clock()
+            left_counts = np.cumsum(histogram[feature_idx], axis=0)[:-1]
+            right_counts = total_counts - left_counts
+            n_left = left_counts.sum(axis=1)
+            n_right = n_samples - n_left
+
+            valid = (n_left > 0) & (n_right > 0)
+            if not np.any(valid):
+                continue
+            left_counts, right_counts = left_counts[valid], right_counts[valid]
+            n_left, n_right = n_left[valid], n_right[valid]
+
+            left_gini = 1 - np.sum((left_counts / n_left[:, None]) ** 2, axis=1)
+            right_gini = 1 - np.sum((right_counts / n_right[:, None]) ** 2, axis=1)
+
+            child_gini = (n_left / n_samples) * left_gini + (n_right / n_samples) * right_gini
+            gains = parent_gini - child_gini
+            self._record_time('gini_seconds', gini_start)
+            self._record('thresholds_evaluated', len(gains))
+
+            best_idx = np.argmax(gains)
+            if gains[best_idx] > best_gain:
+                best_gain = gains[best_idx]
+                best_feature = feature_idx
+                best_bin = np.nonzero(valid)[0][best_idx]
+
+        return best_feature, best_bin, best_gain
+
+    def _add_node(self, rows):
+        node_id = len(self._nodes)
+        self._nodes.append([LEAF, np.nan, LEAF, LEAF])
+        self._values.append(np.bincount(self._y[rows], weights=self._weight[rows], minlength=self.n_classes))
+        return node_id
+
+    def _build_tree(self, start, end, depth=0, histogram=None):
+        # The node's rows are self._samples[start:end]; children get the two
+        # halves of that slice after it is partitioned in place
+        rows = self._samples[start:end]
+        node_id = self._add_node(rows)
+        if self._stats is not None:
+            nodes_per_depth = self._stats['nodes_per_depth']
+            if len(nodes_per_depth) <= depth:
+                nodes_per_depth.append(0)
+            nodes_per_depth[depth] += 1
+        class_counts = self._values[node_id]
+        n_samples = class_counts.sum()
+        n_labels = np.count_nonzero(class_counts)
 
         if depth >= self.max_depth or n_labels == 1 or n_samples < self.min_samples_split:
-            leaf_value = Counter(y).most_common(1)[0][0]
-            return {'type': 'leaf', 'value': leaf_value}
+            return node_id
 
-        best_feature, best_threshold, best_gain = self._best_split(X, y)
+        split_start = self._clock()
+        if self.splitter == 'random':
+            best_feature, best_bin, best_gain = self._random_split(rows, class_counts)
+            best_threshold = best_bin
+            if self.bin_edges is not None and best_feature is not None:
+                best_threshold = self.bin_edges[best_feature][best_bin]
+        elif self.bin_edges is not None:
+            if histogram is None:
+                histogram = self._histogram(rows)
+            best_feature, best_bin, best_gain = self._best_split_binned(histogram)
+            best_threshold = None if best_feature is None else self.bin_edges[best_feature][best_bin]
+        else:
+            best_feature, best_threshold, best_gain = self._best_split(rows)
+        self._record_time('split_seconds', split_start)
 
         #  FIXED: Safe check for None or zero gain
         if best_feature is None or best_threshold is None or best_gain == 0:
-            leaf_value = Counter(y).most_common(1)[0][0]
-            return {'type': 'leaf', 'value': leaf_value}
+            return node_id
 
-        left_mask = X[:, best_feature] <= best_threshold
-        right_mask = ~left_mask
+        partition_start = self._clock()
+        if self.bin_edges is not None:
+            left_mask = self._X[rows, best_feature] <= best_bin
+        else:
+            left_mask = self._X[rows, best_feature] <= best_threshold
+        left_rows, right_rows = rows[left_mask], rows[~left_mask]
+        mid = start + len(left_rows)
+        self._samples[start:mid] = left_rows
+        self._samples[mid:end] = right_rows
+        self._record_time('partition_seconds', partition_start)
 
-        left_subtree = self._build_tree(X[left_mask], y[left_mask], depth + 1)
-        right_subtree = self._build_tree(X[right_mask], y[right_mask], depth + 1)
+        left_histogram = right_histogram = None
+        if histogram is not None:
+            # Build the smaller child's histogram and derive its sibling by subtraction
+            if len(left_rows) <= len(right_rows):
+                left_histogram = self._histogram(left_rows)
+                right_histogram = histogram - left_histogram
+            else:
+                right_histogram = self._histogram(right_rows)
+                left_histogram = histogram - right_histogram
 
-        return {
-            'type': 'split',
-            'feature': best_feature,
-            'threshold': best_threshold,
-            'left': left_subtree,
-            'right': right_subtree
-        }
+        left_child = self._build_tree(start, mid, depth + 1, left_histogram)
+        right_child = self._build_tree(mid, end, depth + 1, right_histogram)
+        self._nodes[node_id] = [best_feature, best_threshold, left_child, right_child]
+
+        return node_id
+
+    def fit(self, X, y, n_classes=None, sample_weight=None, stats=None):
+        """Grow the tree on X and y without copying them; fills stats with build statistics if given"""
+        start = time.perf_counter()
+        self._stats = stats
+        if stats is not None:
+            stats.update(
+                nodes_per_depth=[], thresholds_evaluated=0, split_seconds=0.0, gini_seconds=0.0,
+                histogram_seconds=0.0, partition_seconds=0.0
+            )
+        self.n_classes = n_classes or y.max() + 1
+        if self.bin_edges is not None:
+            self.n_bins = max(len(edges) for edges in self.bin_edges) + 1
+        self._rng = np.random.default_rng(self.random_state)
+        self._nodes, self._values = [], []
+        self._X, self._y = X, y
+        if sample_weight is None:
+            self._weight = np.ones(len(y))
+        else:
+            self._weight = np.asarray(sample_weight, dtype=np.float64)
+        self._samples = np.flatnonzero(self._weight > 0)
+
+        self._build_tree(0, len(self._samples))
+
+        feature, threshold, left, right = zip(*self._nodes)
+        self.feature = np.array(feature, dtype=np.int32)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.children_left = np.array(left, dtype=np.int32)
+        self.children_right = np.array(right, dtype=np.int32)
+        self.value = np.array(self._values, dtype=np.float64)
 
-    def fit(self, X, y):
-        self.tree = self._build_tree(X, y)
+        self._rng = self._nodes = self._values = self._stats = None
+        self._X = self._y = self._weight = self._samples = None
+        if stats is not None:
+            stats.update(
+                build_seconds=time.perf_counter() - start,
+                nodes=self.n_nodes,
+                leaves=int(np.sum(self.feature == LEAF)),
+                depth=len(stats['nodes_per_depth']) - 1,
+                peak_rss_bytes=_peak_rss_bytes()
+            )
         return self
 
-    def _predict_sample(self, sample, tree):
-        if tree['type'] == 'leaf':
-            return tree['value']
+    def apply(self, X):
+        """Return the leaf index reached by every row of X"""
+        X = np.asarray(X, dtype=np.float64)
+        nodes = np.zeros(X.shape[0], dtype=np.intp)
+        active = np.arange(X.shape[0])
 
-        if sample[tree['feature']] <= tree['threshold']:
-            return self._predict_sample(sample, tree['left'])
-        else:
-            return self._predict_sample(sample, tree['right'])
+        # Move every sample still at a split one level down per iteration
+        while len(active):
+            features = self.feature[nodes[active]]
+            at_split = features != LEAF
+            active, features = active[at_split], features[at_split]
+            current = nodes[active]
+            go_left = X[active, features] <= self.threshold[current]
+            nodes[active] = np.where(go_left, self.children_left[current], self.children_right[current])
+
+        return nodes
 
     def predict(self, X):
-        return np.array([self._predict_sample(sample, self.tree) for sample in X])
+        return np.argmax(self.value[self.apply(X)], axis=1)
+
+
+def _fit_tree(X, y, n_classes, tree_params, seed, sample_indices=None, oob_X=None, bootstrap=True,
+              profile=False):
+    """Fit one tree in a worker process; returns (tree, oob, stats)"""
+    stats = {'pid': os.getpid()} if profile else None
+    bootstrap_seed, tree_seed = seed.spawn(2)
+    tree = DecisionTree(random_state=tree_seed, **tree_params)
+    if not bootstrap:
+        sample_weight = None if sample_indices is None else np.bincount(sample_indices, minlength=X.shape[0])
+        tree.fit(X, y, n_classes=n_classes, sample_weight=sample_weight, stats=stats)
+        return tree, None, stats
+
+    n_samples = X.shape[0] if sample_indices is None else len(sample_indices)
+    positions = np.random.default_rng(bootstrap_seed).integers(0, n_samples, n_samples)
+    indices = positions if sample_indices is None else sample_indices[positions]
+
+    # The bootstrap is passed as per-row draw counts over the shared X and y
+    # instead of a resampled copy of them
+    tree.fit(X, y, n_classes=n_classes, sample_weight=np.bincount(indices, minlength=X.shape[0]), stats=stats)
+
+    oob = None
+    if oob_X is not None:
+        oob_positions = np.flatnonzero(np.bincount(positions, minlength=n_samples) == 0)
+        oob_rows = oob_positions if sample_indices is None else sample_indices[oob_positions]
+        oob = (oob_positions, tree.predict(oob_X[oob_rows]))
+    return tree, oob, stats
 
 
 class RandomForestClassifier:
-    def __init__(self, n_estimators=100, max_depth=10, random_state=42):
+    # Callables invoked after every inference call with a dict of traversal stats
+    # (samples, trees, nodes_visited, seconds); stats are only gathered when hooks exist
+    inference_hooks = []
+
+    def __init__(self, n_estimators=100, max_depth=10, random_state=42, max_bins=None, n_jobs=1,
+                 min_samples_split=2, max_features='sqrt', oob_score=False, warm_start=False,
+                 splitter='best', bootstrap=True):
         self.n_estimators = n_estimators
         self.max_depth = max_depth
         self.random_state = random_state
+        self.min_samples_split = min_samples_split
+        # Features considered per split: 'sqrt', 'log2', an int, a fraction in (0, 1] or None for all
+        self.max_features = max_features
+        # 'random' grows extremely randomized trees: one random threshold per candidate feature
+        self.splitter = splitter
+        # Train every tree on a bootstrap resample; otherwise on all rows (usual with splitter='random')
+        self.bootstrap = bootstrap
+        # Histogram-binned training: quantize features into at most max_bins bins
+        self.max_bins = max_bins
+        # Worker processes used by fit(); -1 uses every core
+        self.n_jobs = n_jobs
+        # Score every training row with the trees whose bootstrap left it out
+        self.oob_score = oob_score
+        self.oob_accuracy = None
+        self.oob_probabilities = None
+        # fit() on a fitted forest adds trees up to n_estimators instead of refitting
+        self.warm_start = warm_start
         self.trees = []
+        # Trees ever grown, including retired ones; indexes the next tree's seed
+        self.n_trees_grown = 0
+        # Concatenated node arrays of all trees, built lazily for inference
+        self._packed = None
 
-        if random_state:
-            np.random.seed(random_state)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_packed'] = None
+        # Per-row OOB probabilities are a training artefact; only the score is saved
+        state['oob_probabilities'] = None
+        return state
 
-    def fit(self, X, y):
-        X = np.array(X)
-        y = np.array(y)
+    def __setstate__(self, state):
+        state.setdefault('max_bins', None)
+        state.setdefault('n_jobs', 1)
+        state.setdefault('min_samples_split', 2)
+        state.setdefault('max_features', 'sqrt')
+        state.setdefault('oob_score', False)
+        state.setdefault('oob_accuracy', None)
+        state.setdefault('oob_probabilities', None)
+        state.setdefault('warm_start', False)
+        state.setdefault('splitter', 'best')
+        state.setdefault('bootstrap', True)
+        # The seed cursor must stay past every tree, or growing would replay their seeds
+        state['n_trees_grown'] = max(state.get('n_trees_grown', 0), len(state.get('trees', [])))
+        state['_packed'] = None
+        self.__dict__.update(state)
+        # Trees converted from legacy dicts only know the labels their leaves predict
+        if self.trees:
+            n_classes = max(tree.value.shape[1] for tree in self.trees)
+            for tree in self.trees:
+                tree._pad_classes(n_classes)
+
+    def _resolve_max_features(self, n_features):
+        if self.max_features is None:
+            return None
+        if self.max_features == 'sqrt':
+            return int(np.sqrt(n_features))
+        if self.max_features == 'log2':
+            return max(1, int(np.log2(n_features)))
+        if isinstance(self.max_features, float):
+            return max(1, int(self.max_features * n_features))
+        return self.max_features
+
+    def fit(self, X, y, sample_indices=None, callbacks=None):
+        """Fit on X and y (only sample_indices rows if given); with warm_start grow the
+        fitted forest to n_estimators. callbacks receive fit_start, tree and fit_end events"""
+        if self.warm_start and self.trees:
+            n_new = self.n_estimators - len(self.trees)
+            if n_new < 0:
+                raise ValueError(f"n_estimators={self.n_estimators} is smaller than the "
+                                 f"{len(self.trees)} trees already fitted")
+            return self.grow(X, y, n_new, sample_indices, callbacks=callbacks)
 
         self.trees = []
-        max_features = int(np.sqrt(X.shape[1]))
+        self.n_trees_grown = 0
+        return self._grow_trees(X, y, self.n_estimators, sample_indices, callbacks)
+
+    def grow(self, X, y, n_trees, sample_indices=None, max_trees=None, callbacks=None):
+        """Add n_trees trees trained on X and y to the fitted forest.
+
+        New trees continue the forest's seed sequence, so growing on the same
+        data in steps gives the same trees as a single fit. With max_trees the
+        oldest trees beyond that many are retired afterwards (a sliding
+        window). OOB scores, when enabled, cover only the trees added here.
+        """
+        if n_trees > 0:
+            self._grow_trees(X, y, n_trees, sample_indices, callbacks)
+        if max_trees and len(self.trees) > max_trees:
+            self.trees = self.trees[-max_trees:]
+            self._packed = None
+        self.n_estimators = len(self.trees)
+        return self
+
+    @staticmethod
+    def _emit(callbacks, event, **fields):
+        for callback in callbacks:
+            callback(dict(event=event, timestamp=time.time(), **fields))
+
+    def _grow_trees(self, X, y, n_trees, sample_indices=None, callbacks=None):
+        if self.splitter not in ('best', 'random'):
+            raise ValueError(f"splitter must be 'best' or 'random', got {self.splitter!r}")
+        if self.oob_score and not self.bootstrap:
+            raise ValueError("oob_score requires bootstrap=True")
+        X = np.asarray(X)
+        y = np.asarray(y)
+        callbacks = callbacks or []
+        start = time.perf_counter()
+
+        self._packed = None
+        self.oob_accuracy = self.oob_probabilities = None
+        n_classes = int(y.max()) + 1
+        if self.trees:
+            # New data may not contain every class the existing trees know, or may add one
+            n_classes = max(n_classes, max(tree.value.shape[1] for tree in self.trees))
+            for tree in self.trees:
+                tree._pad_classes(n_classes)
+        if sample_indices is not None:
+            sample_indices = np.asarray(sample_indices)
+        oob_X = X if self.oob_score else None
+
+        bin_edges = None
+        if self.max_bins:
+            binner = FeatureBinner(self.max_bins)
+            binner.fit(X if sample_indices is None else X[sample_indices])
+            X = binner.transform(X)
+            bin_edges = binner.bin_edges
+
+        tree_params = {
+            'max_depth': self.max_depth,
+            'min_samples_split': self.min_samples_split,
+            'max_features': self._resolve_max_features(X.shape[1]),
+            'bin_edges': bin_edges,
+            'splitter': self.splitter
+        }
+        # Tree i draws from child i of random_state's SeedSequence, so the
+        # forest is bit-identical no matter how trees are spread over workers
+        # or over warm-start calls
+        seeds = [
+            np.random.SeedSequence(self.random_state, spawn_key=(self.n_trees_grown + idx,))
+            for idx in range(n_trees)
+        ]
+        first_tree = self.n_trees_grown
+        self.n_trees_grown += n_trees
+
+        n_samples = len(y) if sample_indices is None else len(sample_indices)
+        self._emit(
+            callbacks, 'fit_start', n_trees=n_trees, first_tree=first_tree, n_samples=n_samples,
+            n_features=X.shape[1], n_classes=n_classes, n_jobs=self.n_jobs, params=self.get_params(),
+            setup_seconds=time.perf_counter() - start
+        )
 
-        for i in range(self.n_estimators):
-            n_samples = X.shape[0]
-            indices = np.random.choice(n_samples, n_samples, replace=True)
-            X_sample, y_sample = X[indices], y[indices]
+        # max_nbytes=0 memory-maps X and y once for all workers instead of
+        # pickling them with every tree
+        results = Parallel(n_jobs=self.n_jobs, max_nbytes=0, return_as='generator')(
+            delayed(_fit_tree)(
+                X, y, n_classes, tree_params, seed, sample_indices, oob_X, self.bootstrap, bool(callbacks)
+            )
+            for seed in seeds
+        )
 
-            tree = DecisionTree(max_depth=self.max_depth, max_features=max_features)
-            tree.fit(X_sample, y_sample)
+        # OOB votes are accumulated as trees arrive, so memory stays at one
+        # (rows x classes) count matrix rather than a tree-by-row matrix
+        oob_votes = np.zeros((n_samples, n_classes)) if self.oob_score else None
+        peak_rss = [_peak_rss_bytes()]
+        for idx, (tree, oob, stats) in enumerate(results):
             self.trees.append(tree)
+            if oob is not None:
+                oob_positions, oob_labels = oob
+                oob_votes[oob_positions, oob_labels] += 1
+            if stats is not None:
+                peak_rss.append(stats['peak_rss_bytes'])
+                self._emit(
+                    callbacks, 'tree', tree_index=first_tree + idx, trees_done=idx + 1, n_trees=n_trees,
+                    elapsed_seconds=time.perf_counter() - start, **stats
+                )
 
+        if self.oob_score:
+            self._set_oob_score(oob_votes, y if sample_indices is None else y[sample_indices])
+
+        peak_rss.append(_peak_rss_bytes())
+        self._emit(
+            callbacks, 'fit_end', n_trees=n_trees, forest_trees=len(self.trees),
+            seconds=time.perf_counter() - start, oob_accuracy=self.oob_accuracy,
+            # Largest peak of any single process (parent or worker), not their sum
+            peak_rss_bytes=None if None in peak_rss else max(peak_rss)
+        )
         return self
 
-    def predict(self, X):
-        X = np.array(X)
-        predictions = np.array([tree.predict(X) for tree in self.trees])
+    def _set_oob_score(self, oob_votes, y):
+        n_votes = oob_votes.sum(axis=1)
+        scored = n_votes > 0
+        if not scored.all():
+            logger.warning(f"{np.sum(~scored)} rows were in every bootstrap sample and have no OOB score; "
+                           "use more trees for a complete OOB estimate")
 
-        final_predictions = []
-        for i in range(X.shape[0]):
-            votes = predictions[:, i]
-            prediction = Counter(votes).most_common(1)[0][0]
-            final_predictions.append(prediction)
+        # Rows without OOB votes keep NaN probabilities and are left out of the accuracy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.oob_probabilities = oob_votes / n_votes[:, None]
+        self.oob_accuracy = float(np.mean(np.argmax(oob_votes[scored], axis=1) == y[scored]))
 
-        return np.array(final_predictions)
+    def _pack_trees(self):
+        """Concatenate the node arrays of all trees so one traversal serves the whole forest"""
+        if self._packed is None:
+            n_nodes = np.array([tree.n_nodes for tree in self.trees])
+            value = np.concatenate([tree.value for tree in self.trees])
+            self._packed = {
+                'tree_offset': np.concatenate([[0], np.cumsum(n_nodes)[:-1]]),
+                'feature': np.concatenate([tree.feature for tree in self.trees]),
+                'threshold': np.concatenate([tree.threshold for tree in self.trees]),
+                # Child indices stay local to their tree and are offset during traversal
+                'children_left': np.concatenate([tree.children_left for tree in self.trees]),
+                'children_right': np.concatenate([tree.children_right for tree in self.trees]),
+                'value': value,
+                'leaf_label': np.argmax(value, axis=1).astype(np.int32),
+                'n_classes': value.shape[1]
+            }
+        return self._packed
 
-    def predict_proba(self, X):
-        X = np.array(X)
-        predictions = np.array([tree.predict(X) for tree in self.trees])
+    @property
+    def nbytes(self):
+        """Bytes held by the node arrays of the trees and the packed forest.
+
+        Arrays that are views of another array (trees rebuilt from packed or
+        memory-mapped arrays) are counted once, through the array they view.
+        """
+        arrays = [
+            getattr(tree, name) for tree in self.trees
+            for name in ('feature', 'threshold', 'children_left', 'children_right', 'value')
+        ]
+        if self._packed is not None:
+            arrays.extend(value for value in self._packed.values() if isinstance(value, np.ndarray))
+
+        owners = {}
+        for array in arrays:
+            while isinstance(array.base, np.ndarray):
+                array = array.base
+            owners[id(array)] = array.nbytes
+        return sum(owners.values())
+
+    def _node_distribution(self):
+        """Class distribution of every packed node and its change from the
+        parent node, built lazily for contributions.
+
+        Splits use their training class counts; leaves are one-hot on the label
+        they vote for, so a tree's path telescopes to its vote and the
+        contributions add up to the forest's vote probabilities.
+        """
+        packed = self._pack_trees()
+        if 'distribution' not in packed:
+            value = packed['value']
+            distribution = value / value.sum(axis=1, keepdims=True)
+            leaves = packed['feature'] == LEAF
+            distribution[leaves] = np.eye(packed['n_classes'])[packed['leaf_label'][leaves]]
+
+            tree_base = np.repeat(packed['tree_offset'], np.diff(np.append(packed['tree_offset'], len(value))))
+            splits = np.flatnonzero(~leaves)
+            parent_delta = np.zeros_like(distribution)
+            for children in (packed['children_left'], packed['children_right']):
+                child = tree_base[splits] + children[splits]
+                parent_delta[child] = distribution[child] - distribution[splits]
+            packed['distribution'], packed['parent_delta'] = distribution, parent_delta
+        return packed['distribution'], packed['parent_delta']
+
+    def get_params(self):
+        return {
+            'n_estimators': self.n_estimators,
+            'max_depth': self.max_depth,
+            'random_state': self.random_state,
+            'max_bins': self.max_bins,
+            'min_samples_split': self.min_samples_split,
+            'max_features': self.max_features,
+            'splitter': self.splitter,
+            'bootstrap': self.bootstrap
+        }
+
+    def to_arrays(self):
+        packed = self._pack_trees()
+        return {name: packed[name] for name in PACKED_ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        """Rebuild a fitted forest whose trees are views into the packed arrays (no copies)"""
+        forest = cls(**params)
+        starts = arrays['tree_offset']
+        ends = np.append(starts[1:], len(arrays['feature']))
+        for start, end in zip(starts, ends):
+            tree = DecisionTree(max_depth=forest.max_depth)
+            tree.feature = arrays['feature'][start:end]
+            tree.threshold = arrays['threshold'][start:end]
+            tree.children_left = arrays['children_left'][start:end]
+            tree.children_right = arrays['children_right'][start:end]
+            tree.value = arrays['value'][start:end]
+            forest.trees.append(tree)
+        forest.n_trees_grown = len(forest.trees)
+        forest._packed = dict(arrays, n_classes=arrays['value'].shape[1])
+        return forest
+
+    @classmethod
+    def add_inference_hook(cls, hook):
+        cls.inference_hooks.append(hook)
+
+    def apply(self, X):
+        """Return the packed leaf index reached by every sample in every tree, shape (n_trees, n_samples)"""
+        return self._traverse(X)[0]
+
+    def _traverse(self, X, first_tree=0, last_tree=None, contributions=None):
+        """Traverse trees first_tree..last_tree-1 (default: all) for every sample.
+
+        When a (samples, features, classes) contributions array is given, every
+        step from a split to its child adds the change in class distribution
+        to the split feature of that sample (Saabas path attribution).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        packed = self._pack_trees()
+        feature, threshold = packed['feature'], packed['threshold']
+        children_left, children_right = packed['children_left'], packed['children_right']
+        tree_offset = packed['tree_offset'][first_tree:last_tree]
+
+        # One slot per (tree, sample) pair, tree-major; all trees advance together level by level
+        n_samples = X.shape[0]
+        tree_base = np.repeat(tree_offset, n_samples)
+        sample_index = np.tile(np.arange(n_samples), len(tree_offset))
+        nodes = tree_base.copy()
+        active = np.arange(len(nodes))
+        nodes_visited = 0
+        if contributions is not None:
+            _, parent_delta = self._node_distribution()
+            n_features, n_classes = contributions.shape[1:]
+
+        while len(active):
+            nodes_visited += len(active)
+            current = nodes[active]
+            features = feature[current]
+            at_split = features != LEAF
+            active, current, features = active[at_split], current[at_split], features[at_split]
+            go_left = X[sample_index[active], features] <= threshold[current]
+            child = np.where(go_left, children_left[current], children_right[current])
+            nodes[active] = tree_base[active] + child
+
+            if contributions is not None:
+                # Add this level's steps with one weighted bincount over (sample, feature, class)
+                slots = sample_index[active] * n_features + features
+                flat_slots = slots[:, None] * n_classes + np.arange(n_classes)
+                contributions += np.bincount(
+                    flat_slots.ravel(), weights=parent_delta[nodes[active]].ravel(), minlength=contributions.size
+                ).reshape(contributions.shape)
+
+        return nodes.reshape(len(tree_offset), n_samples), nodes_visited
+
+    def _vote(self, tree_labels, n_classes):
+        n_samples = tree_labels.shape[1]
+        flat_index = np.arange(n_samples) * n_classes + tree_labels
+        votes = np.bincount(flat_index.ravel(), minlength=n_samples * n_classes)
+        votes = votes.reshape(n_samples, n_classes)
+
+        labels = np.argmax(votes, axis=1)
+        top_votes = votes[np.arange(n_samples), labels]
+        tied = np.nonzero(np.sum(votes == top_votes[:, None], axis=1) > 1)[0]
+        if len(tied):
+            # Break ties like the previous Counter.most_common vote did: the
+            # winning class is the first one, in tree order, to reach the top count
+            tied_labels = tree_labels[:, tied]
+            is_top = votes[tied, tied_labels] == top_votes[tied]
+            first_tree = np.argmax(is_top, axis=0)
+            labels[tied] = tied_labels[first_tree, np.arange(len(tied))]
 
-        probabilities = []
-        for i in range(X.shape[0]):
-            votes = predictions[:, i]
-            vote_counts = Counter(votes)
+        return labels, votes
 
-            prob_0 = vote_counts.get(0, 0) / len(self.trees)
-            prob_1 = vote_counts.get(1, 0) / len(self.trees)
+    def predict_all(self, X, contributions=False):
+        """Single forest traversal returning labels, class probabilities and raw vote counts.
 
-            probabilities.append([prob_0, prob_1])
+        With contributions the same traversal also returns 'bias' (the mean
+        root class distribution, shape (classes,)) and 'contributions' of shape
+        (samples, features, classes), so that for every sample
+        bias + contributions.sum(axis=1) equals its probabilities.
+        """
+        hooks = self.inference_hooks
+        start = time.perf_counter() if hooks else None
 
-        return np.array(probabilities)
+        X = np.asarray(X, dtype=np.float64)
+        packed = self._pack_trees()
+        feature_contributions = None
+        if contributions:
+            feature_contributions = np.zeros((X.shape[0], X.shape[1], packed['n_classes']))
+
+        leaves, nodes_visited = self._traverse(X, contributions=feature_contributions)
+        tree_labels = packed['leaf_label'][leaves]
+        labels, votes = self._vote(tree_labels, packed['n_classes'])
+
+        if hooks:
+            stats = {
+                'samples': leaves.shape[1],
+                'trees': leaves.shape[0],
+                'nodes_visited': nodes_visited,
+                'seconds': time.perf_counter() - start
+            }
+            for hook in hooks:
+                hook(stats)
+
+        output = {
+            'labels': labels,
+            'probabilities': votes / len(self.trees),
+            'votes': votes
+        }
+        if contributions:
+            output['bias'] = self._node_distribution()[0][packed['tree_offset']].mean(axis=0)
+            output['contributions'] = feature_contributions / len(self.trees)
+        return output
+
+    def predict_early_exit(self, X, tolerance=None, confidence=0.95):
+        """Stop each sample once its label is settled, or with tolerance once its
+        probabilities are within tolerance of the full forest's; adds trees_used"""
+        hooks = self.inference_hooks
+        start = time.perf_counter() if hooks else None
+
+        X = np.asarray(X, dtype=np.float64)
+        packed = self._pack_trees()
+        n_classes, n_trees = packed['n_classes'], len(self.trees)
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)
+
+        votes = np.zeros((n_samples, n_classes), dtype=np.int64)
+        # Tree index of each class's first vote, for the predict_all tie-break
+        first_vote = np.full((n_samples, n_classes), n_trees, dtype=np.int64)
+        trees_used = np.zeros(n_samples, dtype=np.int64)
+
+        # Fewest trees after which the probability bound is within tolerance
+        tolerance_trees = n_trees
+        if tolerance is not None:
+            n = np.arange(1, n_trees + 1)
+            bound = np.sqrt((1 - (n - 1) / n_trees) * np.log(2 / (1 - confidence)) / (2 * n))
+            within = bound <= tolerance
+            # A tolerance no tree count can meet needs the full forest
+            tolerance_trees = int(n[np.argmax(within)]) if within.any() else n_trees
+
+        # Each traversal costs a numpy pass per tree level, so steps are kept
+        # to at least a tenth of the forest
+        min_step = max(1, n_trees // 10)
+        pending = rows
+        done = 0
+        nodes_visited = 0
+        while len(pending):
+            if tolerance is None:
+                # Jump to the earliest tree count at which some pending sample
+                # could settle: its leader winning every vote in between
+                sorted_votes = np.sort(votes[pending], axis=1)
+                margin = sorted_votes[:, -1] - (sorted_votes[:, -2] if n_classes > 1 else 0)
+                step = max(min_step, int(np.min((n_trees - done - margin) // 2 + 1)))
+            else:
+                # A settled label says nothing about the probability, so every
+                # sample runs to the bound
+                step = tolerance_trees - done
+            stop = min(n_trees, done + step)
+
+            leaves, visited = self._traverse(X[pending], done, stop)
+            nodes_visited += visited
+            tree_labels = packed['leaf_label'][leaves]
+            for class_idx in range(n_classes):
+                is_class = tree_labels == class_idx
+                votes[pending, class_idx] += is_class.sum(axis=0)
+                first = np.where(is_class.any(axis=0), done + np.argmax(is_class, axis=0), n_trees)
+                first_vote[pending, class_idx] = np.minimum(first_vote[pending, class_idx], first)
+            done = stop
+            trees_used[pending] = done
+
+            if tolerance is None:
+                sorted_votes = np.sort(votes[pending], axis=1)
+                margin = sorted_votes[:, -1] - (sorted_votes[:, -2] if n_classes > 1 else 0)
+                settled = (margin > n_trees - done) | (done == n_trees)
+            else:
+                settled = np.full(len(pending), done >= tolerance_trees)
+            pending = pending[~settled]
+
+        # Highest vote wins; ties go to the class voted for first, as in _vote
+        top_votes = votes.max(axis=1, keepdims=True)
+        labels = np.argmin(np.where(votes == top_votes, first_vote, n_trees + 1), axis=1)
+
+        if hooks:
+            stats = {
+                'samples': n_samples,
+                'trees': int(trees_used.max()) if n_samples else 0,
+                'nodes_visited': nodes_visited,
+                'seconds': time.perf_counter() - start
+            }
+            for hook in hooks:
+                hook(stats)
+
+        return {
+            'labels': labels,
+            'probabilities': votes / np.maximum(trees_used, 1)[:, None],
+            'votes': votes,
+            'trees_used': trees_used
+        }
+
+    def predict(self, X):
+        return self.predict_all(X)['labels']
+
+    def predict_proba(self, X):
+        return self.predict_all(X)['probabilities']
 
     def display_model_build_process(self, feature_names=None):
         print(f"Random Forest with {self.n_estimators} trees, max depth {self.max_depth}")
@@ -171,23 +1030,47 @@ class RandomForestClassifier:
             print(f"Features used: {feature_names}")
         print(f"Number of trees built: {len(self.trees)}")
         for idx, tree in enumerate(self.trees[:5]):  # Show info for up to 5 trees
-            print(f"  Tree {idx+1}: Root node type: {tree.tree['type'] if hasattr(tree, 'tree') and tree.tree else 'N/A'}")
+            if tree.feature is None:
+                print(f"  Tree {idx+1}: Root node type: N/A")
+            else:
+                root_type = 'leaf' if tree.feature[0] == LEAF else 'split'
+                print(f"  Tree {idx+1}: Root node type: {root_type} ({tree.n_nodes} nodes)")
         if len(self.trees) > 5:
             print(f"  ...and {len(self.trees) - 5} more trees.")
 
 
 class DiabetesPredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, max_depth=15, random_state=42)
+    def __init__(self, max_bins=None, n_jobs=1, n_estimators=100, max_depth=15, min_samples_split=2,
+                 max_features='sqrt', oob_score=False, splitter='best', bootstrap=True):
+        self.model = RandomForestClassifier(
+            n_estimators=n_estimators, max_depth=max_depth, random_state=42, max_bins=max_bins, n_jobs=n_jobs,
+            min_samples_split=min_samples_split, max_features=max_features, oob_score=oob_score,
+            splitter=splitter, bootstrap=bootstrap
+        )
         self.feature_names = [
             'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
             'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
         ]
         self.is_trained = False
+        # Training metadata (timestamp, parameters) recorded when the model is saved or loaded
+        self.metadata = {}
 
-    def fit(self, X, y):
-        self.model.fit(X, y)
+    def fit(self, X, y, callbacks=None):
+        self.model.fit(X, y, callbacks=callbacks)
         self.is_trained = True
+        if self.model.oob_accuracy is not None:
+            self.metadata['oob_accuracy'] = self.model.oob_accuracy
+        return self
+
+    def grow(self, X, y, n_trees, max_trees=None, callbacks=None):
+        """Add n_trees trees trained on X, y to a trained model, retiring the
+        oldest ones beyond max_trees"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained first")
+        self.model.grow(X, y, n_trees, max_trees=max_trees, callbacks=callbacks)
+        self.metadata.pop('oob_accuracy', None)
+        if self.model.oob_accuracy is not None:
+            self.metadata['oob_accuracy'] = self.model.oob_accuracy
         return self
 
     def predict(self, X):
@@ -200,45 +1083,98 @@ class DiabetesPredictor:
             raise ValueError("Model must be trained first")
         return self.model.predict_proba(X)
 
+    def predict_all(self, X, contributions=False):
+        if not self.is_trained:
+            raise ValueError("Model must be trained first")
+        return self.model.predict_all(X, contributions=contributions)
+
+    def predict_early_exit(self, X, tolerance=None, confidence=0.95):
+        if not self.is_trained:
+            raise ValueError("Model must be trained first")
+        return self.model.predict_early_exit(X, tolerance=tolerance, confidence=confidence)
+
+    # (feature, threshold, message): a risk factor applies when feature >= threshold
+    RISK_FACTOR_RULES = [
+        ('Glucose', 140, "High glucose levels (≥140 mg/dL)"),
+        ('BMI', 30, "Obesity (BMI ≥30)"),
+        ('Age', 45, "Age factor (≥45 years)"),
+        ('BloodPressure', 90, "High blood pressure (≥90 mmHg)"),
+        ('DiabetesPedigreeFunction', 0.5, "Strong family history of diabetes")
+    ]
+
     def get_risk_factors(self, features):
-        risk_factors = []
-        feature_dict = dict(zip(self.feature_names, features))
-
-        if feature_dict['Glucose'] >= 140:
-            risk_factors.append("High glucose levels (≥140 mg/dL)")
-        if feature_dict['BMI'] >= 30:
-            risk_factors.append("Obesity (BMI ≥30)")
-        if feature_dict['Age'] >= 45:
-            risk_factors.append("Age factor (≥45 years)")
-        if feature_dict['BloodPressure'] >= 90:
-            risk_factors.append("High blood pressure (≥90 mmHg)")
-        if feature_dict['DiabetesPedigreeFunction'] >= 0.5:
-            risk_factors.append("Strong family history of diabetes")
-
-        return risk_factors
+        return self.get_risk_factors_batch([features])[0]
+
+    def get_risk_factors_batch(self, X):
+        X = np.asarray(X, dtype=float)
+        columns = [self.feature_names.index(name) for name, _, _ in self.RISK_FACTOR_RULES]
+        thresholds = np.array([threshold for _, threshold, _ in self.RISK_FACTOR_RULES])
+        flags = X[:, columns] >= thresholds
+
+        # Encode each row's flags as a bitmask and look up the message list once per pattern
+        codes = flags @ (1 << np.arange(len(self.RISK_FACTOR_RULES)))
+        messages = {}
+        for code in np.unique(codes):
+            messages[code] = [
+                message for bit, (_, _, message) in enumerate(self.RISK_FACTOR_RULES)
+                if code & (1 << bit)
+            ]
+        return [list(messages[code]) for code in codes]
 
     def save_model(self, filepath):
+        """Save the model; paths ending in COMPACT_MODEL_SUFFIX use the memory-mappable format"""
         if not self.is_trained:
             raise ValueError("Cannot save untrained model")
 
-        model_data = {
-            'model': self.model,
-            'feature_names': self.feature_names,
-            'is_trained': self.is_trained,
-            'timestamp': datetime.now().isoformat()
-        }
+        timestamp = datetime.now().isoformat()
+
+        if str(filepath).endswith(COMPACT_MODEL_SUFFIX):
+            packed = self.model.to_arrays()
+            metadata = dict(
+                self.metadata,
+                timestamp=timestamp,
+                n_trees=len(self.model.trees),
+                n_trees_grown=self.model.n_trees_grown,
+                n_nodes=len(packed['feature']),
+                n_classes=packed['value'].shape[1]
+            )
+            header = {
+                'feature_names': self.feature_names,
+                'model_params': self.model.get_params(),
+                'metadata': metadata
+            }
+            save_arrays(filepath, packed, header)
+        else:
+            model_data = {
+                'model': self.model,
+                'feature_names': self.feature_names,
+                'is_trained': self.is_trained,
+                'timestamp': timestamp
+            }
+            joblib.dump(model_data, filepath)
 
-        joblib.dump(model_data, filepath)
         logger.info(f"Model saved to {filepath}")
 
     @classmethod
-    def load_model(cls, filepath):
-        model_data = joblib.load(filepath)
-
+    def load_model(cls, filepath, mmap=True):
+        """Load a joblib or compact model; compact models are memory-mapped unless mmap=False"""
         instance = cls()
-        instance.model = model_data['model']
-        instance.feature_names = model_data['feature_names']
-        instance.is_trained = model_data['is_trained']
+
+        if is_compact_model(filepath):
+            header, arrays = load_arrays(filepath, mmap=mmap)
+            instance.model = RandomForestClassifier.from_arrays(arrays, header['model_params'])
+            instance.model.n_trees_grown = max(
+                header['metadata'].get('n_trees_grown', 0), len(instance.model.trees)
+            )
+            instance.feature_names = header['feature_names']
+            instance.metadata = header['metadata']
+            instance.is_trained = True
+        else:
+            model_data = joblib.load(filepath)
+            instance.model = model_data['model']
+            instance.feature_names = model_data['feature_names']
+            instance.is_trained = model_data['is_trained']
+            instance.metadata = {'timestamp': model_data.get('timestamp')}
 
         logger.info(f"Model loaded from {filepath}")
         return instance
@@ -0,0 +1,232 @@
+"""Bulk scoring of patient exports with a trained diabetes model.
+
+Usage:
+    python score_bulk.py patients.csv scores.csv --model diabetes_model.rfm --workers 4
+    python score_bulk.py patients.jsonl scores.jsonl --id-column patient_id
+
+The input is a CSV with a header row, or JSONL with one record per line.
+CSV columns may use either the API field names (glucose, bloodPressure, ...)
+or the diabetes.csv column names (Glucose, BloodPressure, ...). Rows are
+validated with the same ranges as the API (validation.py). Invalid rows
+keep their place in the output with an error message.
+
+The input is streamed in chunks of --chunk-rows lines. A process pool
+scores them, and each worker loads the model once. Compact .rfm models are
+memory-mapped, so all workers share one copy of the model in the page
+cache. At most two chunks per worker are in flight, so memory stays
+constant regardless of input size. Results are written in input order.
+Records must fit on one line: quoted CSV fields containing newlines are not
+supported.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ingest import FEATURE_COLUMNS
+from models.random_forest import DiabetesPredictor
+from validation import FEATURE_FIELDS, validate_records, validate_table
+
+# Same preference as the API: the memory-mapped format first
+MODEL_PATHS = ['diabetes_model.rfm', 'diabetes_model.joblib']
+
+OUTPUT_FIELDS = [
+    'prediction', 'probability_diabetic', 'probability_non_diabetic', 'confidence', 'risk_factors', 'error'
+]
+
+# Set in every worker by init_worker()
+_predictor = None
+_config = None
+
+
+def init_worker(model_path, config):
+    global _predictor, _config
+    _predictor = DiabetesPredictor.load_model(model_path)
+    _config = config
+
+
+def file_format(path, override=None):
+    if override:
+        return override
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def csv_columns(header, id_column=None):
+    """Column index of every feature field (and the id column) in a CSV header"""
+    positions = {name.strip(): idx for idx, name in enumerate(header)}
+    columns = {}
+    for field, dataset_column in zip(FEATURE_FIELDS, FEATURE_COLUMNS):
+        if field in positions:
+            columns[field] = positions[field]
+        elif dataset_column in positions:
+            columns[field] = positions[dataset_column]
+        else:
+            raise ValueError(f"input has no column for {field} (or {dataset_column})")
+    if id_column is not None:
+        if id_column not in positions:
+            raise ValueError(f"input has no id column {id_column}")
+        columns['id'] = positions[id_column]
+    return columns
+
+
+def parse_chunk(text):
+    """Return (X, errors, ids) for one chunk of input lines"""
+    lines = text.splitlines()
+    if _config['input_format'] == 'csv':
+        rows = list(csv.reader(lines))
+        columns = {
+            field: [row[idx] if idx < len(row) else '' for row in rows]
+            for field, idx in _config['columns'].items()
+        }
+        X, errors = validate_table(columns)
+        return X, errors, columns.get('id')
+
+    records, invalid_json = [], []
+    for idx, line in enumerate(lines):
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            records.append(None)
+            invalid_json.append(idx)
+    X, errors = validate_records(records)
+    for idx in invalid_json:
+        errors[idx] = 'Invalid JSON'
+    ids = None
+    if _config['id_column'] is not None:
+        ids = [record.get(_config['id_column']) if isinstance(record, dict) else None for record in records]
+    return X, errors, ids
+
+
+def score_chunk(task):
+    """Parse, validate and score one chunk; returns (output text, rows, invalid rows)"""
+    first_row, text = task
+    X, errors, ids = parse_chunk(text)
+    valid = np.array([error is None for error in errors], dtype=bool)
+
+    results = [None] * len(errors)
+    if valid.any():
+        output = _predictor.predict_all(X[valid])
+        risk_factors = _predictor.get_risk_factors_batch(X[valid])
+        probabilities = output['probabilities'].tolist()
+        for position, idx in enumerate(np.flatnonzero(valid)):
+            results[idx] = (bool(output['labels'][position]), probabilities[position], risk_factors[position])
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n') if _config['output_format'] == 'csv' else None
+    for idx, (error, result) in enumerate(zip(errors, results)):
+        record = {'row': first_row + idx}
+        if ids is not None:
+            record['id'] = ids[idx]
+        if result is None:
+            record.update(dict.fromkeys(OUTPUT_FIELDS[:-1]), error=error)
+        else:
+            label, probability, risk_factors = result
+            record.update(
+                prediction=label,
+                probability_diabetic=probability[1],
+                probability_non_diabetic=probability[0],
+                confidence=probability[1] if label else probability[0],
+                risk_factors=risk_factors,
+                error=None
+            )
+        if writer is None:
+            buffer.write(json.dumps(record) + '\n')
+        else:
+            if result is not None:
+                record['prediction'] = int(label)
+                record['risk_factors'] = '; '.join(risk_factors)
+            writer.writerow(['' if value is None else value for value in record.values()])
+    return buffer.getvalue(), len(errors), int((~valid).sum())
+
+
+def read_chunks(f, chunk_rows):
+    """Yield (first row index, text) for every chunk_rows non-blank lines"""
+    lines, first_row = [], 0
+    for line in f:
+        if line.strip():
+            lines.append(line)
+            if len(lines) == chunk_rows:
+                yield first_row, ''.join(lines)
+                first_row += len(lines)
+                lines = []
+    if lines:
+        yield first_row, ''.join(lines)
+
+
+def score_in_order(tasks, workers, model_path, config):
+    """Yield score_chunk results in input order with a bounded number of chunks in flight"""
+    if workers == 0:
+        init_worker(model_path, config)
+        yield from map(score_chunk, tasks)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(model_path, config)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(score_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or JSONL file of patient records")
+    parser.add_argument('input', help="CSV (with header) or JSONL file to score")
+    parser.add_argument('output', help="Where to write predictions (.csv or .jsonl)")
+    parser.add_argument('--model', default=None, help="Trained .rfm or .joblib model (default: diabetes_model.*)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help="Default: from the input file extension")
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], help="Default: from the output file extension")
+    parser.add_argument('--id-column', default=None, help="Column or field copied to the output to join results")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Scoring processes (0 scores in this process)")
+    parser.add_argument('--chunk-rows', type=int, default=10000,
+                        help="Input rows per scoring task; bounds memory per worker")
+    args = parser.parse_args()
+
+    model_path = args.model or next((path for path in MODEL_PATHS if os.path.exists(path)), None)
+    if model_path is None:
+        parser.error("no trained model found; pass --model or run train_model.py")
+
+    config = {
+        'input_format': file_format(args.input, args.input_format),
+        'output_format': file_format(args.output, args.output_format),
+        'id_column': args.id_column
+    }
+    n_rows = n_invalid = 0
+    start = last_report = time.perf_counter()
+
+    with open(args.input, newline='') as source, open(args.output, 'w', newline='') as target:
+        if config['input_format'] == 'csv':
+            try:
+                config['columns'] = csv_columns(next(csv.reader([source.readline()])), args.id_column)
+            except (StopIteration, ValueError) as e:
+                parser.error(f"{args.input}: {e or 'empty file'}")
+        if config['output_format'] == 'csv':
+            id_header = ['id'] if args.id_column else []
+            csv.writer(target, lineterminator='\n').writerow(['row'] + id_header + OUTPUT_FIELDS)
+
+        tasks = read_chunks(source, args.chunk_rows)
+        for text, rows, invalid in score_in_order(tasks, args.workers, model_path, config):
+            target.write(text)
+            n_rows += rows
+            n_invalid += invalid
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                print(f"  {n_rows} rows scored ({n_rows / (now - start):,.0f} rows/s)", file=sys.stderr)
+                last_report = now
+
+    seconds = time.perf_counter() - start
+    print(f"Scored {n_rows} rows ({n_invalid} invalid) with {model_path} in {seconds:.1f} s "
+          f"({n_rows / seconds if seconds else 0:,.0f} rows/s); results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
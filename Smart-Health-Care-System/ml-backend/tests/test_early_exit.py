@@ -0,0 +1,51 @@
+"""Early-exit voting must never trade more accuracy for a tighter tolerance.
+
+Run from the ml-backend directory:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from models.random_forest import RandomForestClassifier
+
+TOLERANCES = [0.5, 0.3, 0.2, 0.1, 0.05, 0.01, 0.005, 0.001, 1e-6]
+
+
+def make_forest(n_estimators):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 8))
+    # Noisy labels keep many votes close, so probabilities vary between trees
+    y = (X[:, 0] + X[:, 1] + rng.normal(scale=1.0, size=len(X)) > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=6, random_state=0)
+    model.fit(X[:400], y[:400])
+    return model, X[400:]
+
+
+@pytest.mark.parametrize('n_estimators', [20, 100])
+def test_tighter_tolerance_never_uses_fewer_trees(n_estimators):
+    model, X = make_forest(n_estimators)
+    previous = np.zeros(len(X), dtype=np.int64)
+    for tolerance in TOLERANCES:
+        trees_used = model.predict_early_exit(X, tolerance=tolerance)['trees_used']
+        assert (trees_used >= previous).all(), tolerance
+        previous = trees_used
+    # No tree count meets a tolerance this tight, so the whole forest votes
+    assert (previous == n_estimators).all()
+
+
+@pytest.mark.parametrize('n_estimators', [20, 100])
+@pytest.mark.parametrize('confidence', [0.9, 0.95])
+def test_probability_error_within_tolerance(n_estimators, confidence):
+    model, X = make_forest(n_estimators)
+    full = model.predict_all(X)['probabilities']
+    for tolerance in TOLERANCES:
+        output = model.predict_early_exit(X, tolerance=tolerance, confidence=confidence)
+        error = np.abs(output['probabilities'] - full).max(axis=1)
+        # The bound holds with probability confidence per sample
+        assert (error <= tolerance).mean() >= confidence, tolerance
@@ -1,241 +1,179 @@
+import argparse
+import time
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from models.random_forest import DiabetesPredictor
+from models.random_forest import MAX_BINS, DiabetesPredictor
+from ingest import DEFAULT_CHUNK_ROWS, FEATURE_COLUMNS, load_dataset
+from training_trace import TrainingTrace
 import os
 
-def load_diabetes_data(csv_path):
-    """Load diabetes data from CSV file"""
-    try:
-        df = pd.read_csv(r"C:\Users\Sandesh\Desktop\Final year Project\Smart_health_care_system\Smart-Health-Care-System\ml-backend\diabetes.csv")
-        df.info()
-        #df.drop_duplicates()
-
-        print(f" Loaded CSV data: {len(df)} samples")
-
-        print(f" Columns: {list(df.columns)}")
-        print(f" Data shape: {df.shape}")
-        return df
-    except FileNotFoundError:
-        print(f" CSV file not found: {csv_path}")
-        print("Please make sure your CSV file is in the correct location.")
-        return None
-    except Exception as e:
-        print(f" Error loading CSV: {e}")
-        return None
-
-def preprocess_data(df):
-    """Preprocess the diabetes dataset"""
-    print("\n Preprocessing data...")
-    
-    # Display basic info about the dataset
-    print(f"Dataset shape: {df.shape}")
-    print(f"Missing values:\n{df.isnull().sum()}")
-    
-    # Common column name mappings (adjust based on your CSV)
-    column_mapping = {
-        # Map your CSV columns to standard names
-        'Pregnancies': 'Pregnancies',
-        'Glucose': 'Glucose', 
-        'BloodPressure': 'BloodPressure',
-        'SkinThickness': 'SkinThickness',
-        'Insulin': 'Insulin',
-        'BMI': 'BMI',
-        'DiabetesPedigreeFunction': 'DiabetesPedigreeFunction',
-        'Age': 'Age',
-        'Outcome': 'Outcome'
-    }
-    
-    # Check if columns exist and rename if needed
-    #available_columns = df.columns.tolist()
-    #print(f"Available columns: {available_columns}")
-
-    # Check for NaNs in labels
-    #print("Any NaNs in labels:", pd.isnull(df['Outcome']).any())
-
-    # Drop rows with missing target labels
-    df = df.dropna(subset=['Outcome'])
-    df = df.reset_index(drop=True)
-    df.info()
-
-    #print("Any NaNs in labels:", pd.isnull(df['Outcome']).any())
-    #df.info()
-    
-    #Handle missing values
-    #df = df.fillna(df.median(numeric_only=True))
-   
-
-    
-    # Remove any duplicate rows
-    #df = df.drop_duplicates()
-    #df = df.reset_index(drop=True)
-
-    print(f" Preprocessed data shape: {df.shape}")
-    df.info()
-    return df
-
-def analyze_data(df):
+def analyze_data(X, y):
     """Analyze the dataset"""
     print("\n Dataset Analysis:")
     print("-" * 40)
-    
-    # Basic statistics
-    print(f"Total samples: {len(df)}")
-    
-    if 'Outcome' in df.columns:
 
-#        
-#       # Get the number of diabetic and non-diabetic cases
-#        if 1 in outcome_counts.index:
-#            diabetic_cases = outcome_counts[1]
-#
-#        else:
-#            diabetic_cases = 0
-#
-#       if 0 in outcome_counts.index:
-#            non_diabetic_cases = outcome_counts[0]
-#        else:
-#            non_diabetic_cases = 0
-#
-#        # Calculate percentages
-#    total_cases = len(df)
-#    diabetic_percent = (diabetic_cases / total_cases) * 100
-#    non_diabetic_percent = (non_diabetic_cases / total_cases) * 100
-#
-#        # Print the results
-#    print(f"Diabetes cases (1): {diabetic_cases} ({diabetic_percent:.1f}%)")
-#    print(f"Non-diabetes cases (0): {non_diabetic_cases} ({non_diabetic_percent:.1f}%)")
-        #diabetic_count = outcome_counts.loc[1] if 1 in outcome_counts.index else 0
-        #non_diabetic_count = outcome_counts.loc[0] if 0 in outcome_counts.index else 0
+    # Basic statistics
+    print(f"Total samples: {len(y)}")
 
-       # print(f"Diabetes cases (1): {diabetic_count} ({diabetic_count / len(df) * 100:.1f}%)")
-        #print(f"Non-diabetes cases (0): {non_diabetic_count} ({non_diabetic_count / len(df) * 100:.1f}%)")
+    outcome_counts = np.bincount(y, minlength=2)
+    print(f"Diabetes cases (1): {outcome_counts[1]} ({outcome_counts[1]/len(y)*100:.1f}%)")
+    print(f"Non-diabetes cases (0): {outcome_counts[0]} ({outcome_counts[0]/len(y)*100:.1f}%)")
 
-        outcome_counts = df['Outcome'].value_counts()
-        print(f"Diabetes cases (1): {outcome_counts.get(1, 0)} ({outcome_counts.get(1, 0)/len(df)*100:.1f}%)")
-        print(f"Non-diabetes cases (0): {outcome_counts.get(0, 0)} ({outcome_counts.get(0, 0)/len(df)*100:.1f}%)")
-    
     # Feature statistics
     print(f"\nFeature ranges:")
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_columns:
-        if col != 'Outcome':
-            print(f"  {col}: {df[col].min():.1f} - {df[col].max():.1f} (mean: {df[col].mean():.1f})")
+    for col, low, high, mean in zip(FEATURE_COLUMNS, X.min(axis=0), X.max(axis=0), X.mean(axis=0)):
+        print(f"  {col}: {low:.1f} - {high:.1f} (mean: {mean:.1f})")
+
+def max_features_arg(value):
+    """Parse --max-features: sqrt, log2, none, an integer count or a fraction"""
+    if value in ('sqrt', 'log2'):
+        return value
+    if value == 'none':
+        return None
+    return float(value) if '.' in value else int(value)
+
+def max_bins_arg(value):
+    """Parse --max-bins: an integer between 2 and MAX_BINS"""
+    max_bins = int(value)
+    if not 2 <= max_bins <= MAX_BINS:
+        raise argparse.ArgumentTypeError(f"must be between 2 and {MAX_BINS}")
+    return max_bins
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the diabetes prediction model")
+    parser.add_argument('--n-estimators', type=int, default=100, help="Trees in the forest")
+    parser.add_argument('--max-depth', type=int, default=15, help="Maximum depth of each tree")
+    parser.add_argument('--min-samples-split', type=int, default=2, help="Minimum samples needed to split a node")
+    parser.add_argument(
+        '--max-features', type=max_features_arg, default='sqrt',
+        help="Features tried per split: sqrt, log2, none, a count or a fraction (see tune_model.py)"
+    )
+    parser.add_argument(
+        '--splitter', choices=['best', 'random'], default='best',
+        help="best: score every threshold; random: extremely randomized trees, one random "
+             "threshold per feature (much faster to train, usually slightly less accurate)"
+    )
+    parser.add_argument(
+        '--bootstrap', action=argparse.BooleanOptionalAction, default=None,
+        help="Train each tree on a bootstrap resample (default: on for best, off for random)"
+    )
+    parser.add_argument(
+        '--max-bins', type=max_bins_arg, default=None,
+        help=f"Histogram-binned training: quantize each feature into at most this many bins (2-{MAX_BINS})"
+    )
+    parser.add_argument(
+        '--n-jobs', type=int, default=1,
+        help="Worker processes used to train trees in parallel (-1 uses every core)"
+    )
+    parser.add_argument(
+        '--oob', action='store_true',
+        help="Report out-of-bag accuracy, estimated from the rows each tree's bootstrap left out"
+    )
+    parser.add_argument(
+        '--test-size', type=float, default=0.2,
+        help="Fraction held out for evaluation; 0 trains on every row (combine with --oob)"
+    )
+    parser.add_argument(
+        '--trace', default=None, metavar='PATH',
+        help="Print per-tree progress and write training events and a timing summary to this JSON file"
+    )
+    parser.add_argument(
+        '--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diabetes.csv'),
+        help="Training CSV export (default: diabetes.csv next to this script)"
+    )
+    parser.add_argument(
+        '--cache-dir', default=None,
+        help="Directory for the cleaned .npy dataset cache (default: next to the CSV)"
+    )
+    parser.add_argument('--no-cache', action='store_true', help="Parse the CSV without reading or writing the cache")
+    parser.add_argument('--refresh-cache', action='store_true', help="Rebuild the dataset cache from the CSV")
+    parser.add_argument(
+        '--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+        help="CSV rows parsed per chunk while building the cache"
+    )
+    args = parser.parse_args()
+    if args.bootstrap is None:
+        args.bootstrap = args.splitter == 'best'
+    if args.oob and not args.bootstrap:
+        parser.error("--oob needs --bootstrap")
+    return args
 
 def main():
+    args = parse_args()
+
     print(" Training Diabetes Prediction Model with Real Data")
     print("=" * 60)
     
-    # Try to find CSV file in different locations
-   
-    csv_path = r"C:\Users\Sandesh\Desktop\Final year Project\Smart_health_care_system\Smart-Health-Care-System\ml-backend\diabetes.csv"
-    df = load_diabetes_data(csv_path)
-
-    if df is None:
+    try:
+        X, y = load_dataset(
+            args.data, cache_dir=args.cache_dir, chunk_rows=args.chunk_rows,
+            use_cache=not args.no_cache, refresh=args.refresh_cache
+        )
+    except (OSError, ValueError) as e:
+        print(f" Error loading {args.data}: {e}")
         print("Failed to load data. Exiting.")
         return
 
-    df['Pregnancies'] = pd.to_numeric(df['Pregnancies'], errors='coerce')  # Convert non-numeric to NaN
-    df = df.dropna(subset=['Pregnancies'])  # Remove rows where Pregnancies is NaN
-    df['Pregnancies'] = df['Pregnancies'].astype(int)  # Convert to int
-
-    df['Glucose'] = pd.to_numeric(df['Glucose'], errors='coerce')  # Convert invalid entries to NaN
-    df = df.dropna(subset=['Glucose'])
-    df['Glucose'] = df['Glucose'].astype(float)
-
-    df['BloodPressure'] = pd.to_numeric(df['BloodPressure'], errors='coerce')  # Convert invalid to NaN
-    df = df.dropna(subset=['BloodPressure'])
-    df['BloodPressure'] = df['BloodPressure'].astype(float)
-
-    df['SkinThickness'] = pd.to_numeric(df['SkinThickness'], errors='coerce')  # Convert invalid to NaN
-    df = df.dropna(subset=['SkinThickness'])
-    df['SkinThickness'] = df['SkinThickness'].astype(float)
-
-    df['Insulin'] = pd.to_numeric(df['Insulin'], errors='coerce')  # Convert invalid entries to NaN
-    df = df.dropna(subset=['Insulin'])
-    df['Insulin'] = df['Insulin'].astype(float)
-
-    df['BMI'] = pd.to_numeric(df['BMI'], errors='coerce')  # Convert invalid entries to NaN
-    df = df.dropna(subset=['BMI'])
-    df['BMI'] = df['BMI'].astype(float)
-
-    df['DiabetesPedigreeFunction'] = pd.to_numeric(df['DiabetesPedigreeFunction'], errors='coerce')
-    df = df.dropna(subset=['DiabetesPedigreeFunction'])
-    df['DiabetesPedigreeFunction'] = df['DiabetesPedigreeFunction'].astype(float)
-
-    df['Age'] = pd.to_numeric(df['Age'], errors='coerce')
-    df = df.dropna(subset=['Age'])
-    df['Age'] = df['Age'].astype(int)
-
-    df['Outcome'] = pd.to_numeric(df['Outcome'], errors='coerce')
-    df = df.dropna(subset=['Outcome'])       # remove rows with NaN Outcome
-    df['Outcome'] = df['Outcome'].astype(int)
-
+    print(f" Loaded data: {len(y)} valid samples from {args.data}")
 
-
-    # Preprocess the data
-    df = preprocess_data(df)
-    
     # Analyze the data
-    analyze_data(df)
-    
-    # Prepare features and target
-    feature_columns = [
-        'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-        'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-    ]
-    
-    # # Check if all required columns exist
-    # missing_columns = [col for col in feature_columns if col not in df.columns]
-    # if missing_columns:
-    #     print(f"\n Missing required columns: {missing_columns}")
-    #     print("Please make sure your CSV has these columns:")
-    #     for col in feature_columns:
-    #         print(f"  - {col}")
-    #     return
-    
-    # if 'Outcome' not in df.columns:
-    #     print("\n Missing 'Outcome' column (target variable)")
-    #     print("Please make sure your CSV has an 'Outcome' column with 0/1 values")
-    #     return
-    
-    # Extract features and target
-    X = df[feature_columns].values
-    y = df['Outcome'].values
-    y = y.astype(int)
-    
+    analyze_data(X, y)
+
     # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    if args.test_size > 0:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=args.test_size, random_state=42, stratify=y
+        )
+    else:
+        X_train, X_test, y_train, y_test = X, None, y, None
     
     print(f"\n Training set: {len(X_train)} samples")
-    print(f" Test set: {len(X_test)} samples")
+    print(f" Test set: {0 if y_test is None else len(y_test)} samples")
     
     # Train model
-    print("\n Training Random Forest model...")
-    model = DiabetesPredictor()
-    model.fit(X_train, y_train)
+    print(f"\n Training {'Extra Trees' if args.splitter == 'random' else 'Random Forest'} model...")
+    model = DiabetesPredictor(
+        max_bins=args.max_bins, n_jobs=args.n_jobs, n_estimators=args.n_estimators, max_depth=args.max_depth,
+        min_samples_split=args.min_samples_split, max_features=args.max_features, oob_score=args.oob,
+        splitter=args.splitter, bootstrap=args.bootstrap
+    )
+    trace = TrainingTrace(progress=True) if args.trace else None
+    start = time.perf_counter()
+    model.fit(X_train, y_train, callbacks=[trace] if trace else None)
+    print(f" Trained in {time.perf_counter() - start:.1f} s")
+    if trace:
+        trace.write(args.trace)
+        summary = trace.summary()
+        share = summary['build_share']
+        print(f" Tree build time: split search {share['split']:.0%} (Gini scoring {share['gini']:.0%}), "
+              f"histograms {share['histogram']:.0%}, partitioning {share['partition']:.0%}")
+        print(f" Training trace written to {args.trace}")
     #model.show_training_steps()
     
-    # Evaluate model
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    
     print(f"\nModel Performance:")
-    print(f"Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
-    print("\nClassification Report:")
-    print(classification_report(y_test, y_pred))
-    
-    print("\nConfusion Matrix:")
-    print(confusion_matrix(y_test, y_pred))
+    if args.oob:
+        oob_accuracy = model.model.oob_accuracy
+        print(f"OOB accuracy: {oob_accuracy:.4f} ({oob_accuracy*100:.2f}%)")
+
+    # Evaluate model
+    if y_test is not None:
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+
+        print(f"Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
+        print("\nClassification Report:")
+        print(classification_report(y_test, y_pred))
+
+        print("\nConfusion Matrix:")
+        print(confusion_matrix(y_test, y_pred))
     
     # Save model
     model_path = 'diabetes_model.joblib'
     model.save_model(model_path)
     print(f"\nModel saved as '{model_path}'")
-    print(f" Data source: {csv_path}")
+    print(f" Data source: {args.data}")
     
     # Test prediction with sample data
     print("\n Testing with sample prediction...")
@@ -248,48 +186,34 @@ def main():
 
 
 
-# def generate_synthetic_data(n_samples=2000):
+def generate_synthetic_data(n_samples=2000, random_state=42):
+    """Generate seeded synthetic diabetes data (same columns as diabetes.csv)"""
+    rng = np.random.default_rng(random_state)
 
-    # """Generate synthetic data as fallback"""
-    # print(" Generating synthetic diabetes data...")
-    # np.random.seed(42)
-    
-    # data = {
-    #     'Pregnancies': np.random.poisson(3, n_samples),
-    #     'Glucose': np.random.normal(120, 30, n_samples),
-    #     'BloodPressure': np.random.normal(70, 15, n_samples),
-    #     'SkinThickness': np.random.normal(20, 10, n_samples),
-    #     'Insulin': np.random.exponential(80, n_samples),
-    #     'BMI': np.random.normal(32, 8, n_samples),
-    #     'DiabetesPedigreeFunction': np.random.exponential(0.5, n_samples),
-    #     'Age': np.random.normal(33, 12, n_samples)
-    # }
-    
-    # df = pd.DataFrame(data)
-    
-    # # Clip to realistic ranges
-    # df['Pregnancies'] = np.clip(df['Pregnancies'], 0, 15)
-    # df['Glucose'] = np.clip(df['Glucose'], 50, 300)
-    # df['BloodPressure'] = np.clip(df['BloodPressure'], 40, 150)
-    # df['SkinThickness'] = np.clip(df['SkinThickness'], 5, 60)
-    # df['Insulin'] = np.clip(df['Insulin'], 10, 500)
-    # df['BMI'] = np.clip(df['BMI'], 15, 60)
-    # df['DiabetesPedigreeFunction'] = np.clip(df['DiabetesPedigreeFunction'], 0.1, 2.5)
-    # df['Age'] = np.clip(df['Age'], 18, 80)
-    
-    # # Create target based on risk factors
-    # risk_score = (
-    #     (df['Glucose'] > 140) * 0.4 +
-    #     (df['BMI'] > 30) * 0.3 +
-    #     (df['Age'] > 45) * 0.2 +
-    #     (df['BloodPressure'] > 90) * 0.1 +
-    #     (df['DiabetesPedigreeFunction'] > 0.5) * 0.2 +
-    #     np.random.normal(0, 0.15, n_samples)
-    # )
-    
-    # df['Outcome'] = (risk_score > 0.5).astype(int)
-    
-    # return df
+    # Draw and clip straight into float arrays so millions of rows stay cheap
+    data = {
+        'Pregnancies': np.clip(rng.poisson(3, n_samples), 0, 15),
+        'Glucose': np.clip(rng.normal(120, 30, n_samples), 50, 300),
+        'BloodPressure': np.clip(rng.normal(70, 15, n_samples), 40, 150),
+        'SkinThickness': np.clip(rng.normal(20, 10, n_samples), 5, 60),
+        'Insulin': np.clip(rng.exponential(80, n_samples), 10, 500),
+        'BMI': np.clip(rng.normal(32, 8, n_samples), 15, 60),
+        'DiabetesPedigreeFunction': np.clip(rng.exponential(0.5, n_samples), 0.1, 2.5),
+        'Age': np.clip(rng.normal(33, 12, n_samples), 18, 80)
+    }
+
+    # Create target based on risk factors
+    risk_score = (
+        (data['Glucose'] > 140) * 0.4 +
+        (data['BMI'] > 30) * 0.3 +
+        (data['Age'] > 45) * 0.2 +
+        (data['BloodPressure'] > 90) * 0.1 +
+        (data['DiabetesPedigreeFunction'] > 0.5) * 0.2 +
+        rng.normal(0, 0.15, n_samples)
+    )
+    data['Outcome'] = (risk_score > 0.5).astype(int)
+
+    return pd.DataFrame(data)
 
 if __name__ == "__main__":
     main()
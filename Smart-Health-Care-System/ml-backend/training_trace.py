@@ -0,0 +1,65 @@
+"""Collects RandomForestClassifier training events into a JSON trace.
+
+    trace = TrainingTrace(progress=True)
+    model.fit(X, y, callbacks=[trace])
+    trace.write('train_trace.json')
+
+The trace holds every fit_start, tree and fit_end event as emitted
+plus a summary that adds up where build time went across trees: split
+search, the Gini scoring inside it, histograms and partitioning. It also
+gives the nodes created per depth and the slowest trees.
+"""
+import json
+import numpy as np
+
+# Per-tree timings added up in the summary, as reported by DecisionTree.fit
+TIMINGS = ['build_seconds', 'split_seconds', 'gini_seconds', 'histogram_seconds', 'partition_seconds']
+
+
+class TrainingTrace:
+    def __init__(self, progress=False):
+        self.progress = progress
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+        if self.progress and event['event'] == 'tree':
+            print(f"  tree {event['trees_done']:>4}/{event['n_trees']} built in {event['build_seconds']:.2f} s "
+                  f"({event['nodes']} nodes, depth {event['depth']}, {event['elapsed_seconds']:.1f} s elapsed)")
+
+    def summary(self):
+        trees = [event for event in self.events if event['event'] == 'tree']
+        ends = [event for event in self.events if event['event'] == 'fit_end']
+        if not trees:
+            return {}
+
+        timings = {name: float(sum(tree[name] for tree in trees)) for name in TIMINGS}
+        build_seconds = timings['build_seconds']
+        max_depth = max(len(tree['nodes_per_depth']) for tree in trees)
+        nodes_per_depth = np.zeros(max_depth, dtype=np.int64)
+        for tree in trees:
+            nodes_per_depth[:len(tree['nodes_per_depth'])] += tree['nodes_per_depth']
+        peaks = [event['peak_rss_bytes'] for event in ends if event['peak_rss_bytes'] is not None]
+
+        return {
+            'trees': len(trees),
+            'wall_seconds': float(sum(event['seconds'] for event in ends)),
+            **timings,
+            # Fraction of tree build time spent in each phase
+            'build_share': {
+                name.replace('_seconds', ''): value / build_seconds if build_seconds else 0.0
+                for name, value in timings.items() if name != 'build_seconds'
+            },
+            'thresholds_evaluated': int(sum(tree['thresholds_evaluated'] for tree in trees)),
+            'nodes': int(sum(tree['nodes'] for tree in trees)),
+            'nodes_per_depth': nodes_per_depth.tolist(),
+            'slowest_trees': [
+                {'tree_index': tree['tree_index'], 'build_seconds': tree['build_seconds'], 'nodes': tree['nodes']}
+                for tree in sorted(trees, key=lambda tree: -tree['build_seconds'])[:5]
+            ],
+            'peak_rss_bytes': max(peaks) if peaks else None
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'events': self.events}, f, indent=2)
@@ -0,0 +1,197 @@
+"""Hyperparameter search for the diabetes forest with successive halving.
+
+Usage:
+    python tune_model.py --data diabetes.csv --candidates 24 --folds 5 --n-jobs -1 --target 0.95
+
+Candidates drawn from PARAM_GRID are scored with stratified k-fold
+cross-validation. Every rung evaluates the surviving candidates on more
+folds and keeps the best 1/eta of them, so weak configurations are dropped
+after a single fold. Fold jobs run in a process pool; the dataset is the
+memory-mapped cache from ingest.py and folds are passed as index arrays, so
+workers never copy it.
+"""
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold
+
+from ingest import load_dataset
+from models.random_forest import RandomForestClassifier
+
+PARAM_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [5, 10, 15, 20],
+    'min_samples_split': [2, 10, 50],
+    'max_features': ['sqrt', 0.5, None]
+}
+
+
+def sample_candidates(grid, n_candidates, seed):
+    names = list(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    if n_candidates and n_candidates < len(candidates):
+        order = np.random.default_rng(seed).permutation(len(candidates))[:n_candidates]
+        candidates = [candidates[idx] for idx in order]
+    return candidates
+
+
+def evaluate_fold(X, y, params, train_idx, test_idx):
+    """Fit one candidate on one fold; module-level so worker processes can run it"""
+    forest = RandomForestClassifier(random_state=42, n_jobs=1, **params)
+
+    start = time.perf_counter()
+    forest.fit(X, y, sample_indices=train_idx)
+    fit_seconds = time.perf_counter() - start
+
+    X_test = X[test_idx]
+    start = time.perf_counter()
+    labels = forest.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'accuracy': float(np.mean(labels == y[test_idx])),
+        'fit_seconds': fit_seconds,
+        'predict_us_per_row': predict_seconds / len(test_idx) * 1e6,
+        'nodes': int(sum(tree.n_nodes for tree in forest.trees))
+    }
+
+
+def summarize(result):
+    folds = result['folds']
+    return dict(
+        result['params'],
+        folds=len(folds),
+        rung=result['rung'],
+        accuracy=float(np.mean([fold['accuracy'] for fold in folds])),
+        accuracy_std=float(np.std([fold['accuracy'] for fold in folds])),
+        fit_seconds=float(np.mean([fold['fit_seconds'] for fold in folds])),
+        predict_us_per_row=float(np.mean([fold['predict_us_per_row'] for fold in folds])),
+        nodes=int(np.mean([fold['nodes'] for fold in folds]))
+    )
+
+
+def successive_halving(X, y, candidates, n_folds=5, eta=3, n_jobs=1, seed=42):
+    """Return one summary per candidate, with the rung and folds it reached"""
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    folds = list(splitter.split(np.zeros((len(y), 1)), y))
+    results = [{'params': params, 'folds': [], 'rung': 0} for params in candidates]
+    survivors = list(range(len(candidates)))
+    n_evaluated, rung = 1, 0
+
+    # max_nbytes=0 hands workers the memory-mapped dataset and fold indices
+    # by reference instead of pickling them into every task
+    with Parallel(n_jobs=n_jobs, max_nbytes=0) as parallel:
+        while True:
+            tasks = [
+                (idx, fold) for idx in survivors
+                for fold in range(len(results[idx]['folds']), n_evaluated)
+            ]
+            start = time.perf_counter()
+            outputs = parallel(
+                delayed(evaluate_fold)(X, y, candidates[idx], *folds[fold]) for idx, fold in tasks
+            )
+            for (idx, _), output in zip(tasks, outputs):
+                results[idx]['folds'].append(output)
+            for idx in survivors:
+                results[idx]['rung'] = rung
+            print(f" Rung {rung}: {len(survivors)} candidates x {n_evaluated} folds "
+                  f"({len(tasks)} fits, {time.perf_counter() - start:.1f} s)")
+
+            if n_evaluated == n_folds:
+                break
+            # Rank by mean CV accuracy, breaking ties in favour of smaller forests
+            ranked = sorted(survivors, key=lambda idx: (
+                -np.mean([fold['accuracy'] for fold in results[idx]['folds']]),
+                np.mean([fold['nodes'] for fold in results[idx]['folds']])
+            ))
+            survivors = ranked[:max(1, len(survivors) // eta)]
+            n_evaluated = min(n_folds, n_evaluated * eta)
+            rung += 1
+
+    return [summarize(result) for result in results]
+
+
+def format_max_features(value):
+    return 'none' if value is None else str(value)
+
+
+def print_table(summaries):
+    print(f"\n{'trees':>5} {'depth':>5} {'split':>5} {'features':>8} {'folds':>5} {'accuracy':>13} "
+          f"{'nodes':>8} {'fit s':>7} {'us/row':>7}")
+    for row in summaries:
+        print(f"{row['n_estimators']:>5} {row['max_depth']:>5} {row['min_samples_split']:>5} "
+              f"{format_max_features(row['max_features']):>8} {row['folds']:>5} "
+              f"{row['accuracy']:>7.4f}±{row['accuracy_std']:.3f} {row['nodes']:>8} "
+              f"{row['fit_seconds']:>7.2f} {row['predict_us_per_row']:>7.1f}")
+
+
+def eta_arg(value):
+    """Parse --eta: an integer of at least 2, or rungs would never shrink"""
+    eta = int(value)
+    if eta < 2:
+        raise argparse.ArgumentTypeError("must be at least 2")
+    return eta
+
+
+def train_command(params):
+    return (f"python train_model.py --n-estimators {params['n_estimators']} --max-depth {params['max_depth']} "
+            f"--min-samples-split {params['min_samples_split']} "
+            f"--max-features {format_max_features(params['max_features'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search")
+    parser.add_argument('--data', default='diabetes.csv', help="Training CSV export")
+    parser.add_argument('--candidates', type=int, default=24, help="Configurations sampled from the grid (0 = all)")
+    parser.add_argument('--folds', type=int, default=5, help="Stratified cross-validation folds")
+    parser.add_argument('--eta', type=eta_arg, default=3, help="Keep 1/eta of the candidates after every rung")
+    parser.add_argument('--n-jobs', type=int, default=1, help="Worker processes (-1 uses every core)")
+    parser.add_argument('--target', type=float, default=None, help="Accuracy the cheapest reported model must reach")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='tuning_results.json')
+    args = parser.parse_args()
+
+    X, y = load_dataset(args.data)
+    candidates = sample_candidates(PARAM_GRID, args.candidates, args.seed)
+    print(f" Tuning on {len(y)} samples: {len(candidates)} candidates, {args.folds} folds, eta={args.eta}")
+
+    summaries = successive_halving(X, y, candidates, args.folds, args.eta, args.n_jobs, args.seed)
+    summaries.sort(key=lambda row: (-row['folds'], -row['accuracy'], row['nodes']))
+    print_table(summaries)
+
+    best = summaries[0]
+    param_names = list(PARAM_GRID)
+    print(f"\nBest configuration ({best['folds']}-fold accuracy {best['accuracy']:.4f}):")
+    print(f"  {train_command(best)}")
+
+    cheapest = None
+    if args.target is not None:
+        meeting = [row for row in summaries if row['accuracy'] >= args.target]
+        if meeting:
+            cheapest = min(meeting, key=lambda row: (row['nodes'], -row['accuracy']))
+            print(f"Cheapest configuration reaching {args.target:.4f} "
+                  f"({cheapest['nodes']} nodes, {cheapest['folds']}-fold accuracy {cheapest['accuracy']:.4f}):")
+            print(f"  {train_command(cheapest)}")
+        else:
+            print(f"No configuration reached the target accuracy {args.target:.4f}")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'best': {name: best[name] for name in param_names},
+            'cheapest_meeting_target': cheapest and {name: cheapest[name] for name in param_names},
+            'target': args.target,
+            'folds': args.folds,
+            'eta': args.eta,
+            'candidates': summaries
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
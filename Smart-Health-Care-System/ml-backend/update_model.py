@@ -0,0 +1,74 @@
+"""Grow a trained diabetes model with trees trained on newly labeled rows.
+
+Usage:
+    python update_model.py --model diabetes_model.rfm --data confirmed_outcomes.csv \
+        --add-trees 20 --max-trees 100 --output diabetes_model.next.rfm
+
+The new trees are appended to the existing forest and, with --max-trees,
+the oldest trees beyond that many are retired, so nightly runs keep a
+sliding window over recent data without a full retrain. CSVs use the same
+columns as diabetes.csv and are loaded through ingest.py.
+
+The updated model is written to --output. Compact models are written to a
+temporary file and renamed into place, so passing the served artifact as
+--output deploys the update atomically; the API's watcher picks it up.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ingest import load_dataset
+from models.random_forest import DiabetesPredictor
+
+
+def load_rows(paths):
+    arrays = [load_dataset(path) for path in paths]
+    return np.concatenate([X for X, _ in arrays]), np.concatenate([y for _, y in arrays])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add trees trained on new data to an existing model")
+    parser.add_argument('--model', default='diabetes_model.joblib', help="Trained .joblib or .rfm model")
+    parser.add_argument('--data', nargs='+', required=True, help="CSV exports the new trees are trained on")
+    parser.add_argument('--add-trees', type=int, help="Number of trees to add")
+    parser.add_argument('--n-estimators', type=int, help="Grow the forest to this many trees instead")
+    parser.add_argument('--max-trees', type=int, default=None, help="Retire the oldest trees beyond this many")
+    parser.add_argument('--oob', action='store_true', help="Report the new trees' out-of-bag accuracy")
+    parser.add_argument('--n-jobs', type=int, default=1, help="Worker processes (-1 uses every core)")
+    parser.add_argument('--eval-data', help="CSV to report accuracy on before and after the update")
+    parser.add_argument('--output', required=True, help="Where to save the updated model")
+    args = parser.parse_args()
+
+    if (args.add_trees is None) == (args.n_estimators is None):
+        parser.error("give exactly one of --add-trees and --n-estimators")
+
+    model = DiabetesPredictor.load_model(args.model)
+    X, y = load_rows(args.data)
+    n_before = len(model.model.trees)
+    n_trees = args.add_trees if args.add_trees is not None else args.n_estimators - n_before
+    if n_trees < 0:
+        parser.error(f"the model already has {n_before} trees")
+
+    X_eval = y_eval = None
+    if args.eval_data:
+        X_eval, y_eval = load_dataset(args.eval_data)
+        print(f"Accuracy before update: {np.mean(model.predict(X_eval) == y_eval):.4f}")
+
+    model.model.n_jobs = args.n_jobs
+    model.model.oob_score = args.oob
+    start = time.perf_counter()
+    model.grow(X, y, n_trees, max_trees=args.max_trees)
+    print(f"Added {n_trees} trees on {len(y)} rows in {time.perf_counter() - start:.1f} s; "
+          f"forest has {len(model.model.trees)} trees (was {n_before})")
+    if args.oob:
+        print(f"OOB accuracy of the new trees: {model.model.oob_accuracy:.4f}")
+    if X_eval is not None:
+        print(f"Accuracy after update: {np.mean(model.predict(X_eval) == y_eval):.4f}")
+
+    model.save_model(args.output)
+    print(f"Model saved as '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
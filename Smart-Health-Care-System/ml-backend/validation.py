@@ -0,0 +1,107 @@
+"""Validation of prediction request fields, shared by the API endpoints"""
+import numpy as np
+
+# Request field names in model feature order, with their inclusive valid ranges
+FEATURE_FIELDS = [
+    'pregnancies', 'glucose', 'bloodPressure', 'skinThickness',
+    'insulin', 'bmi', 'diabetesPedigree', 'age'
+]
+
+FEATURE_RANGES = {
+    'pregnancies': (0, 20),
+    'glucose': (50, 400),
+    'bloodPressure': (40, 200),
+    'skinThickness': (0, 100),
+    'insulin': (0, 1000),
+    'bmi': (10, 70),
+    'diabetesPedigree': (0, 3),
+    'age': (18, 120)
+}
+
+MIN_VALUES = np.array([FEATURE_RANGES[field][0] for field in FEATURE_FIELDS], dtype=float)
+MAX_VALUES = np.array([FEATURE_RANGES[field][1] for field in FEATURE_FIELDS], dtype=float)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_records(records):
+    """Validate a list of request records against the field table.
+
+    Returns (X, errors): X is a float array with one row per record and
+    errors holds None for valid rows or the first error message of an
+    invalid row. Rows with errors keep NaN features in X.
+    """
+    n_records = len(records)
+    errors = [None] * n_records
+    rows = []
+
+    for idx, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[idx] = 'Record must be an object'
+            rows.append([None] * len(FEATURE_FIELDS))
+            continue
+        missing = [field for field in FEATURE_FIELDS if field not in record]
+        if missing:
+            errors[idx] = f'Missing required field: {missing[0]}'
+        rows.append([record.get(field) for field in FEATURE_FIELDS])
+
+    try:
+        # Fast path: every value is numeric (or a numeric string)
+        X = np.array(rows, dtype=float).reshape(n_records, len(FEATURE_FIELDS))
+    except (TypeError, ValueError):
+        X = np.full((n_records, len(FEATURE_FIELDS)), np.nan)
+        for idx, row in enumerate(rows):
+            for col, value in enumerate(row):
+                number = _to_float(value)
+                if number is None:
+                    if errors[idx] is None:
+                        errors[idx] = f'Invalid input: {FEATURE_FIELDS[col]} must be a number'
+                else:
+                    X[idx, col] = number
+
+    check_ranges(X, errors)
+    return X, errors
+
+
+def validate_table(columns):
+    """Vectorized validation of raw text columns, e.g. from a CSV chunk.
+
+    columns maps every field in FEATURE_FIELDS to a sequence of strings
+    (empty for a missing value). Returns (X, errors) like validate_records,
+    with the same error messages.
+    """
+    n_records = len(columns[FEATURE_FIELDS[0]])
+    errors = [None] * n_records
+    X = np.empty((n_records, len(FEATURE_FIELDS)))
+    for col, field in enumerate(FEATURE_FIELDS):
+        values = np.asarray(columns[field], dtype=str)
+        missing = np.char.str_len(np.char.strip(values)) == 0
+        try:
+            X[:, col] = np.where(missing, '0', values).astype(float)
+        except ValueError:
+            numbers = [_to_float(value) for value in values.tolist()]
+            X[:, col] = [np.nan if number is None else number for number in numbers]
+        X[missing, col] = np.nan
+        for idx in np.nonzero(np.isnan(X[:, col]))[0]:
+            if errors[idx] is None:
+                errors[idx] = (f'Missing required field: {field}' if missing[idx]
+                               else f'Invalid input: {field} must be a number')
+
+    check_ranges(X, errors)
+    return X, errors
+
+
+def check_ranges(X, errors):
+    """Set the range error of every row of X that has no error yet"""
+    # Range checks for the whole batch at once; NaN fails both comparisons
+    out_of_range = ~((X >= MIN_VALUES) & (X <= MAX_VALUES))
+    for idx in np.nonzero(out_of_range.any(axis=1))[0]:
+        if errors[idx] is None:
+            field = FEATURE_FIELDS[np.argmax(out_of_range[idx])]
+            min_val, max_val = FEATURE_RANGES[field]
+            errors[idx] = f'{field} must be between {min_val} and {max_val}'